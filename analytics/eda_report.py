@@ -1,62 +1,334 @@
+import matplotlib
+matplotlib.use('Agg')
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+import pyarrow.dataset as ds
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import json
+import time
+import sys
 import os
 
 # Set style
 sns.set(style="whitegrid")
 
-DATA_PATH = 'cleaned_data.csv'
-REPORT_DIR = 'reports'
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, '..'))
+REPORT_DIR = os.getenv("REPORT_DIR", os.path.join(BASE_DIR, 'reports'))
 
-def run_eda():
-    if not os.path.exists(DATA_PATH):
-        print("Data file not found. Run etl_process.py first.")
-        return
+from analytics.feature_store import data_available, iter_features
 
-    df = pd.read_csv(DATA_PATH)
-    
-    if not os.path.exists(REPORT_DIR):
-        os.makedirs(REPORT_DIR)
-        
-    print("Generating EDA Report...")
-    
-    # 1. Summary Statistics
-    with open(f"{REPORT_DIR}/summary_stats.txt", "w") as f:
+# Input fingerprint of every artifact, from the run that last wrote it
+FINGERPRINT_PATH = os.path.join(REPORT_DIR, 'fingerprints.json')
+# Part of every fingerprint; bump it when the layout of a chart or of the summary changes
+REPORT_VERSION = 1
+
+AMOUNT_BINS = 50
+# Amounts are counted in buckets this wide while streaming, then regrouped into AMOUNT_BINS bars
+AMOUNT_RESOLUTION = 1.0
+# Quantiles are exact up to this many rows and estimated from a uniform sample of this size beyond
+QUANTILE_SAMPLE_ROWS = 100_000
+
+def iter_source(source=None, batch_size=200_000):
+    """Yields the EDA input in chunks: the feature store by default, or a CSV file or Parquet file/directory."""
+    if source is None:
+        yield from iter_features(batch_size=batch_size)
+    elif source.endswith('.csv'):
+        yield from pd.read_csv(source, chunksize=batch_size)
+    else:
+        for batch in ds.dataset(source, format='parquet', partitioning='hive').to_batches(batch_size=batch_size):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+class StreamingSummary:
+    """Everything the report needs, accumulated chunk by chunk in a single pass.
+
+    Means and variances are merged per chunk with Chan's parallel form of
+    Welford's update, and the co-moment matrix for the correlations the same
+    way, so no chunk is kept after it has been folded in. Quantiles come from
+    a uniform sample of at most `sample_size` rows (exact below that size).
+    """
+
+    def __init__(self, sample_size=QUANTILE_SAMPLE_ROWS, seed=42):
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.rows = 0
+        self.columns = None
+        self.numeric = None
+        self.missing = None
+        self.digests = None
+        self.sample = None
+        self._sample_keys, self._sample_rows = [], []
+        self._sample_threshold = np.inf
+        self._amount_counts = []
+        self._segment_counts = []
+
+    def _start(self, chunk):
+        self.columns = chunk.columns.tolist()
+        self.numeric = chunk.select_dtypes(include='number').columns.tolist()
+        k = len(self.numeric)
+        self.missing = pd.Series(0, index=self.columns)
+        self.digests = {column: hashlib.sha256() for column in self.columns}
+        self.count, self.mean, self.m2 = np.zeros(k), np.zeros(k), np.zeros(k)
+        self.min, self.max = np.full(k, np.inf), np.full(k, -np.inf)
+        self.pair_count, self.pair_mean, self.comoment = 0, np.zeros(k), np.zeros((k, k))
+
+    def update(self, chunk):
+        if self.columns is None:
+            self._start(chunk)
+        self.rows += len(chunk)
+        self.missing += chunk.isnull().sum()
+
+        # 1. Content fingerprint of every column
+        for column in self.columns:
+            self.digests[column].update(pd.util.hash_pandas_object(chunk[column], index=False).to_numpy().tobytes())
+
+        # 2. Count, mean, variance, min and max per numeric column (ignoring missing values)
+        X = chunk[self.numeric].to_numpy(dtype=np.float64)
+        present = ~np.isnan(X)
+        n_b = present.sum(axis=0)
+        mean_b = np.divide(np.nansum(X, axis=0), n_b, out=np.zeros(len(n_b)), where=n_b > 0)
+        m2_b = np.nansum((X - mean_b) ** 2, axis=0)
+        self.count, self.mean, self.m2 = self._merge(self.count, self.mean, self.m2, n_b, mean_b, m2_b)
+        if len(X):
+            self._update_sample(X)
+            self.min = np.fmin(self.min, np.nanmin(X, axis=0, initial=np.inf))
+            self.max = np.fmax(self.max, np.nanmax(X, axis=0, initial=-np.inf))
+
+        # 3. Co-moments over rows without missing values, for the correlation matrix
+        complete = X[present.all(axis=1)]
+        if len(complete):
+            mean_c = complete.mean(axis=0)
+            centred = complete - mean_c
+            n_a, n_c = self.pair_count, len(complete)
+            delta = mean_c - self.pair_mean
+            self.comoment += centred.T @ centred + np.outer(delta, delta) * n_a * n_c / (n_a + n_c)
+            self.pair_mean = self.pair_mean + delta * n_c / (n_a + n_c)
+            self.pair_count = n_a + n_c
+
+        # 4. Counts behind the charts, combined once at the end
+        if 'amount' in chunk:
+            buckets, counts = np.unique(np.floor(chunk['amount'].dropna().to_numpy() / AMOUNT_RESOLUTION),
+                                        return_counts=True)
+            self._amount_counts.append(pd.Series(counts, index=buckets))
+        if 'segment' in chunk:
+            self._segment_counts.append(chunk['segment'].astype(str).value_counts())
+
+    def _update_sample(self, X):
+        # Same scheme as rollups.reservoir_sample (keep the rows with the smallest random keys),
+        # on arrays. Candidates are only compacted once they reach twice the sample size; after
+        # that, rows whose key is above the largest kept key can never enter and are dropped early.
+        keys = self.rng.random(len(X))
+        candidates = keys < self._sample_threshold
+        self._sample_keys.append(keys[candidates])
+        self._sample_rows.append(X[candidates])
+        if sum(len(k) for k in self._sample_keys) >= 2 * self.sample_size:
+            self._compact_sample()
+
+    def _compact_sample(self):
+        keys, rows = np.concatenate(self._sample_keys), np.concatenate(self._sample_rows)
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            keys, rows = keys[keep], rows[keep]
+            self._sample_threshold = keys.max()
+        self._sample_keys, self._sample_rows = [keys], [rows]
+        self.sample = rows
+
+    @property
+    def amount_buckets(self):
+        return pd.concat(self._amount_counts).groupby(level=0).sum() if self._amount_counts else pd.Series(dtype='int64')
+
+    @property
+    def segment_counts(self):
+        return pd.concat(self._segment_counts).groupby(level=0).sum() if self._segment_counts else pd.Series(dtype='int64')
+
+    @staticmethod
+    def _merge(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        share = np.divide(n_b, n, out=np.zeros(len(n)), where=n > 0)
+        return n, mean_a + delta * share, m2_a + m2_b + delta ** 2 * n_a * share
+
+    def fingerprint(self, columns):
+        """Content hash of `columns`; changes whenever any of their values (or the report version) does."""
+        digest = hashlib.sha256(f"v{REPORT_VERSION}:{self.rows}".encode())
+        for column in columns:
+            digest.update(column.encode())
+            digest.update(self.digests[column].digest())
+        return digest.hexdigest()
+
+    def describe(self):
+        """Same layout as DataFrame.describe(); quantiles are approximate beyond `sample_size` rows."""
+        std = np.sqrt(np.divide(self.m2, self.count - 1, out=np.full(len(self.m2), np.nan), where=self.count > 1))
+        self._compact_sample()
+        quantiles = pd.DataFrame(self.sample, columns=self.numeric).quantile([0.25, 0.5, 0.75])
+        stats = pd.DataFrame([self.count, self.mean, std, self.min], columns=self.numeric,
+                             index=['count', 'mean', 'std', 'min'])
+        quantiles.index = ['25%', '50%', '75%']
+        maximum = pd.DataFrame([self.max], columns=self.numeric, index=['max'])
+        return pd.concat([stats, quantiles, maximum])
+
+    def correlation(self):
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.outer(std, std)
+        return pd.DataFrame(corr, index=self.numeric, columns=self.numeric)
+
+def write_summary(path, summary):
+    with open(path, "w") as f:
         f.write("Dataset Shape:\n")
-        f.write(str(df.shape) + "\n\n")
+        f.write(str((summary['rows'], len(summary['columns']))) + "\n\n")
         f.write("Columns:\n")
-        f.write(str(df.columns.tolist()) + "\n\n")
+        f.write(str(summary['columns']) + "\n\n")
         f.write("Missing Values:\n")
-        f.write(str(df.isnull().sum()) + "\n\n")
+        f.write(str(summary['missing']) + "\n\n")
         f.write("Descriptive Statistics:\n")
-        f.write(str(df.describe()) + "\n")
+        f.write(str(summary['describe']) + "\n")
+        if summary['rows'] > QUANTILE_SAMPLE_ROWS:
+            f.write(f"\nQuantiles estimated from a uniform sample of {QUANTILE_SAMPLE_ROWS:,} rows.\n")
+
+def plot_amount_distribution(path, summary):
+    buckets, std = summary['amount_buckets'], summary['amount_std']
+    centres = (buckets.index.to_numpy() + 0.5) * AMOUNT_RESOLUTION
+    counts = buckets.to_numpy()
+    # Regrouped into AMOUNT_BINS equal bars over the observed range, like histplot(bins=50)
+    low, high = summary['amount_min'], summary['amount_max']
+    edges = np.linspace(low, high, AMOUNT_BINS + 1)
+    bars, _ = np.histogram(np.clip(centres, low, high), bins=edges, weights=counts)
+
+    # Gaussian KDE of the bucketed amounts, Scott's bandwidth, scaled to bar counts
+    n = counts.sum()
+    bandwidth = max(std * n ** (-1 / 5), AMOUNT_RESOLUTION)
+    grid = np.linspace(low, high, 200)
+    density = np.zeros(len(grid))
+    for start in range(0, len(centres), 4096):
+        z = (grid[:, None] - centres[None, start:start + 4096]) / bandwidth
+        density += np.exp(-0.5 * z ** 2) @ counts[start:start + 4096]
+    density /= n * bandwidth * np.sqrt(2 * np.pi)
 
-    # 2. Distribution of Transaction Amounts
     plt.figure(figsize=(10, 6))
-    sns.histplot(df['amount'], bins=50, kde=True)
+    plt.bar(edges[:-1], bars, width=np.diff(edges), align='edge', alpha=0.5, edgecolor='white')
+    plt.plot(grid, density * n * (edges[1] - edges[0]))
     plt.title('Distribution of Transaction Amounts')
     plt.xlabel('Amount')
     plt.ylabel('Frequency')
-    plt.savefig(f"{REPORT_DIR}/amount_distribution.png")
+    plt.savefig(path)
     plt.close()
-    
-    # 3. Transactions by Segment
+
+def plot_segment_counts(path, summary):
+    counts = summary['segment_counts'].sort_index()
     plt.figure(figsize=(8, 5))
-    sns.countplot(x='segment', data=df)
+    sns.barplot(x=counts.index, y=counts.to_numpy())
+    plt.xlabel('segment')
+    plt.ylabel('count')
     plt.title('Transaction Count by Customer Segment')
-    plt.savefig(f"{REPORT_DIR}/segment_counts.png")
+    plt.savefig(path)
     plt.close()
-    
-    # 4. Correlation Heatmap (Numerical only)
+
+def plot_correlation_heatmap(path, summary):
     plt.figure(figsize=(10, 8))
-    numeric_df = df.select_dtypes(include=['float64', 'int64'])
-    sns.heatmap(numeric_df.corr(), annot=True, cmap='coolwarm', fmt=".2f")
+    sns.heatmap(summary['correlation'], annot=True, cmap='coolwarm', fmt=".2f")
     plt.title('Correlation Heatmap')
-    plt.savefig(f"{REPORT_DIR}/correlation_heatmap.png")
+    plt.savefig(path)
     plt.close()
-    
-    print(f"EDA Reports saved to {os.path.abspath(REPORT_DIR)}")
+
+def render(task):
+    """Pool worker: writes one artifact from its (small) precomputed summary."""
+    name, writer, summary = task
+    start = time.perf_counter()
+    writer(os.path.join(REPORT_DIR, name), summary)
+    return name, time.perf_counter() - start
+
+def artifact_tasks(stats):
+    """(file name, writer, input columns, summary) for every report artifact."""
+    amount = stats.numeric.index('amount') if 'amount' in stats.numeric else None
+    tasks = [('summary_stats.txt', write_summary, stats.columns, {
+        'rows': stats.rows, 'columns': stats.columns, 'missing': stats.missing, 'describe': stats.describe()
+    })]
+    if amount is not None:
+        tasks.append(('amount_distribution.png', plot_amount_distribution, ['amount'], {
+            'amount_buckets': stats.amount_buckets,
+            'amount_std': float(np.sqrt(stats.m2[amount] / max(stats.count[amount] - 1, 1))),
+            'amount_min': float(stats.min[amount]),
+            'amount_max': float(stats.max[amount]),
+        }))
+    segment_counts = stats.segment_counts
+    if len(segment_counts):
+        tasks.append(('segment_counts.png', plot_segment_counts, ['segment'], {
+            'segment_counts': segment_counts
+        }))
+    tasks.append(('correlation_heatmap.png', plot_correlation_heatmap, stats.numeric, {
+        'correlation': stats.correlation()
+    }))
+    return tasks
+
+def load_fingerprints():
+    if not os.path.exists(FINGERPRINT_PATH):
+        return {}
+    with open(FINGERPRINT_PATH, 'r') as f:
+        return json.load(f)
+
+def save_fingerprints(fingerprints):
+    tmp_path = f"{FINGERPRINT_PATH}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(fingerprints, f, indent=2)
+    os.replace(tmp_path, FINGERPRINT_PATH)
+
+def run_eda(source=None, workers=None, force=False, batch_size=200_000):
+    if source is None and not data_available():
+        print("Data file not found. Run etl_process.py first.")
+        return
+
+    if not os.path.exists(REPORT_DIR):
+        os.makedirs(REPORT_DIR)
+
+    print("Generating EDA Report...")
+    start = time.perf_counter()
+
+    # 1. One streaming pass: statistics, chart inputs and column fingerprints
+    stats = StreamingSummary()
+    for chunk in iter_source(source, batch_size):
+        stats.update(chunk)
+    if stats.columns is None:
+        print("No rows to analyse.")
+        return
+    print(f"Scanned {stats.rows:,} rows in {time.perf_counter() - start:.2f}s.")
+
+    # 2. Skip artifacts whose input columns have not changed since they were written
+    fingerprints = load_fingerprints()
+    stale = []
+    for name, writer, columns, summary in artifact_tasks(stats):
+        fingerprint = stats.fingerprint(columns)
+        if not force and fingerprints.get(name) == fingerprint and os.path.exists(os.path.join(REPORT_DIR, name)):
+            print(f"  {name}: unchanged, skipped")
+            continue
+        fingerprints[name] = fingerprint
+        stale.append((name, writer, summary))
+
+    # 3. Render the rest, one process per artifact
+    workers = min(workers or os.cpu_count() or 1, len(stale))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(render, stale))
+    else:
+        results = [render(task) for task in stale]
+    for name, seconds in results:
+        print(f"  {name}: written in {seconds:.2f}s")
+    save_fingerprints(fingerprints)
+
+    print(f"EDA Reports saved to {os.path.abspath(REPORT_DIR)} in {time.perf_counter() - start:.2f}s")
 
 if __name__ == "__main__":
-    run_eda()
+    parser = argparse.ArgumentParser(description="Write summary statistics and charts of the analysis-ready data.")
+    parser.add_argument("--source", default=None,
+                        help="CSV file or Parquet file/directory to analyse (default: the feature store).")
+    parser.add_argument("--workers", type=int, default=None, help="Processes rendering charts (default: CPU count).")
+    parser.add_argument("--force", action="store_true", help="Rewrite every artifact, even if its inputs are unchanged.")
+    parser.add_argument("--batch-size", type=int, default=200_000, help="Rows read per chunk.")
+    args = parser.parse_args()
+    run_eda(args.source, args.workers, args.force, args.batch_size)
@@ -1,23 +1,40 @@
 import sqlite3
 import pandas as pd
+import multiprocessing
+import argparse
+import pathlib
+import shutil
+import json
+import time
+import sys
 import os
 
 # Paths
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, '../database/legacy_system.db')
-OUTPUT_PATH = os.path.join(BASE_DIR, 'cleaned_data.csv')
+sys.path.append(os.path.join(BASE_DIR, '..'))
+DB_PATH = os.getenv("LEGACY_DB_PATH", os.path.join(BASE_DIR, '../database/legacy_system.db'))
 
-def extract_data():
-    print("Connecting to database...")
-    try:
-        conn = sqlite3.connect(DB_PATH)
-    except sqlite3.Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
+from analytics.feature_store import (
+    STORE_PATH, store_exists, append_features, upsert_features,
+    write_features, new_staging_dir, replace_store
+)
+from analytics.rollups import ROLLUP_PATH, build_rollups, update_rollups, rollups_version
+from analytics.features import to_datetime64, add_features
+from monitoring import metrics
+from monitoring.metrics import peak_memory_mb
+
+STAGE_SECONDS = metrics.histogram('etl_stage_seconds', 'Duration of each ETL stage (per chunk when streaming).', ['stage'])
+ROWS = metrics.counter('etl_rows_total', 'Rows written to the feature store.', ['mode'])
+
+# High-water mark of the last successful run (used by incremental mode)
+STATE_PATH = os.getenv("ETL_STATE_PATH", os.path.join(BASE_DIR, 'etl_state.json'))
 
-    query = """
-    SELECT 
+# CROSS JOIN pins `transactions` as the outer loop: SQLite then reads it in
+# transaction_id order and can use its indexes for the incremental filter,
+# while customers are looked up by primary key.
+EXTRACT_QUERY = """
+    SELECT
         t.transaction_id,
         t.customer_id,
         t.amount,
@@ -27,54 +44,337 @@ def extract_data():
         c.segment,
         c.account_created_date
     FROM transactions t
-    JOIN customers c ON t.customer_id = c.customer_id
+    CROSS JOIN customers c ON t.customer_id = c.customer_id
     """
-    
-    print("Extracting data...")
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+
+# New rows, plus rows the legacy BatchProcessor moved from PENDING to PROCESSED.
+# `>=` on processed_at: rows the batch stamps with the watermark's own timestamp
+# after the snapshot would be missed by `>`. Rows at the boundary are re-read
+# every run, which is harmless since the load upserts by transaction_id.
+INCREMENTAL_FILTER = "WHERE t.transaction_id > ? OR t.processed_at >= ?"
+# Watermarks saved before any row was processed carry no processed_at: new rows only
+NEW_ROWS_FILTER = "WHERE t.transaction_id > ?"
+
+# Separate subqueries so each MAX() is answered from an index instead of a table scan.
+# With nothing processed yet, the snapshot time (whole seconds, a prefix of every
+# processed_at format) stands in, so rows processed later are still picked up.
+WATERMARK_QUERY = """
+    SELECT
+        (SELECT MAX(transaction_id) FROM transactions),
+        COALESCE((SELECT MAX(processed_at) FROM transactions), strftime('%Y-%m-%d %H:%M:%S', 'now'))
+    """
+
+# Keyset pagination on the primary key: each chunk is a rowid range search, never a scan
+RANGE_FILTER = "WHERE t.transaction_id > ? AND t.transaction_id <= ?"
+ID_BOUNDS_QUERY = """
+    SELECT
+        (SELECT MIN(transaction_id) FROM transactions),
+        (SELECT MAX(transaction_id) FROM transactions)
+    """
+# Transaction ids extracted per chunk inside a shard when no --chunk-size is given
+SHARD_CHUNK_IDS = 500_000
+
+def load_watermark():
+    if not os.path.exists(STATE_PATH):
+        return None
+    with open(STATE_PATH, 'r') as f:
+        return json.load(f)
+
+def save_watermark(watermark):
+    # Write to a temp file first so a crash never leaves a half-written state file
+    tmp_path = f"{STATE_PATH}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(watermark, f, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+def _connect():
+    print("Connecting to database...")
+    try:
+        return sqlite3.connect(DB_PATH)
+    except sqlite3.Error as e:
+        print(f"Error connecting to database: {e}")
+        return None
+
+def _begin_snapshot(conn):
+    # Read the watermark and the rows in one transaction so both see the same snapshot
+    conn.execute("BEGIN")
+    max_id, max_processed_at = conn.execute(WATERMARK_QUERY).fetchone()
+    return {
+        "last_transaction_id": max_id or 0,
+        "last_processed_at": max_processed_at
+    }
+
+def _delta_query(watermark):
+    if watermark is None:
+        print("Extracting data...")
+        return EXTRACT_QUERY, ()
+    print(f"Extracting rows changed since transaction_id={watermark['last_transaction_id']}, "
+          f"processed_at={watermark['last_processed_at']}...")
+    if watermark['last_processed_at'] is None:
+        # Binding '' instead would match every processed row and re-read the whole history
+        return EXTRACT_QUERY + NEW_ROWS_FILTER, (watermark['last_transaction_id'],)
+    params = (watermark['last_transaction_id'], watermark['last_processed_at'])
+    return EXTRACT_QUERY + INCREMENTAL_FILTER, params
+
+def extract_delta(watermark=None):
+    """Extracts rows changed since `watermark` (all rows if None) and the new watermark."""
+    conn = _connect()
+    if conn is None:
+        return None, None
+
+    try:
+        with STAGE_SECONDS.time(stage='extract'):
+            new_watermark = _begin_snapshot(conn)
+            query, params = _delta_query(watermark)
+            df = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
     print(f"Extracted {len(df)} rows.")
+    return df, new_watermark
+
+def extract_chunks(chunk_size, watermark=None):
+    """Like extract_delta, but returns an iterator of DataFrames of at most `chunk_size` rows.
+
+    The connection stays open until the iterator is exhausted.
+    """
+    conn = _connect()
+    if conn is None:
+        return None, None
+
+    new_watermark = _begin_snapshot(conn)
+    query, params = _delta_query(watermark)
+
+    def chunks():
+        try:
+            yield from pd.read_sql_query(query, conn, params=params, chunksize=chunk_size)
+        finally:
+            conn.close()
+
+    return chunks(), new_watermark
+
+def extract_data():
+    df, _ = extract_delta()
     return df
 
-def transform_data(df):
-    print("Transforming data...")
+def shard_ranges(low, high, shards):
+    """Splits the id range (low, high] into `shards` contiguous (start, end] ranges."""
+    step = -(-(high - low) // shards)
+    return [(start, min(start + step, high)) for start in range(low, high, step)]
+
+def _connect_read_only(db_path):
+    # mode=ro: a shard worker can never take a write lock (or create a missing database)
+    return sqlite3.connect(f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+
+def transform_data(df, verbose=True):
+    if verbose:
+        print("Transforming data...")
     
     # 1. Handle Missing Values (Simulated)
     # The simulated data is mostly clean, but let's ensure
     df = df.dropna()
     
     # 2. Convert Dates
-    df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-    df['account_created_date'] = pd.to_datetime(df['account_created_date'])
+    # The account date repeats for every transaction of a customer, so it is parsed once per value
+    df['transaction_date'] = to_datetime64(df['transaction_date'])
+    df['account_created_date'] = to_datetime64(df['account_created_date'], repeated=True)
     
-    # 3. Feature Engineering
-    # Feature 1: Transaction Hour
-    df['tx_hour'] = df['transaction_date'].dt.hour
-    
-    # Feature 2: Day of Week
-    df['tx_day_of_week'] = df['transaction_date'].dt.dayofweek
-    
-    # Feature 3: Account Age (days at time of tx)
-    df['account_age_days'] = (df['transaction_date'] - df['account_created_date']).dt.days
-    
-    # Feature 4: High Value Transaction Flag
-    df['is_high_value'] = (df['amount'] > 500).astype(int)
+    # 3. Feature Engineering (see analytics/features.py)
+    # Transaction hour, day of week, account age (days at time of tx) and the high value flag
+    add_features(df)
     
     # Encode Categorical Variables (One-Hot Encoding for 'transaction_type' and 'segment')
     # For a simple ETL, we might just keep them for now or encode them.
     # Let's keep them as is for EDA, but we might need to encode for ML later.
     # We'll save the "Analysis Ready" dataset.
     
-    print("Transformation complete.")
+    if verbose:
+        print("Transformation complete.")
     return df
 
 def load_data(df):
-    print(f"Saving data to {OUTPUT_PATH}...")
-    df.to_csv(OUTPUT_PATH, index=False)
+    print(f"Saving data to {STORE_PATH}...")
+    with STAGE_SECONDS.time(stage='load'):
+        write_features(df)
+    print("Data saved successfully.")
+
+def upsert_data(df, last_transaction_id):
+    """Merges a transformed delta into the feature store keyed by transaction_id."""
+    if df['transaction_id'].min() > last_transaction_id:
+        # Only brand-new rows: add files without touching what is already on disk
+        print(f"Appending {len(df)} new rows to {STORE_PATH}...")
+        with STAGE_SECONDS.time(stage='load'):
+            append_features(df)
+    else:
+        print(f"Upserting {len(df)} rows into {STORE_PATH}...")
+        with STAGE_SECONDS.time(stage='upsert'):
+            upsert_features(df)
     print("Data saved successfully.")
 
+def etl_shard(task):
+    """Pool worker: extracts and transforms one (start, end] id range chunk by chunk into `staging`."""
+    db_path, shard, (start, end), chunk_size, staging = task
+    conn = _connect_read_only(db_path)
+    rows = 0
+    # (stage, seconds) per chunk, recorded by the parent since pool workers have their own metrics
+    timings = []
+    try:
+        for i, low in enumerate(range(start, end, chunk_size)):
+            t0 = time.perf_counter()
+            df = pd.read_sql_query(EXTRACT_QUERY + RANGE_FILTER, conn, params=(low, min(low + chunk_size, end)))
+            t1 = time.perf_counter()
+            clean = transform_data(df, verbose=False)
+            t2 = time.perf_counter()
+            # Names sort by shard, then chunk, i.e. by transaction_id: the store reads back in serial order
+            append_features(clean, staging, basename=f"part-{shard:05d}-{i:06d}")
+            timings += [('extract', t1 - t0), ('transform', t2 - t1), ('load', time.perf_counter() - t2)]
+            rows += len(clean)
+    finally:
+        conn.close()
+    return rows, peak_memory_mb(), timings
+
+def parallel_pipeline(workers, chunk_size=None):
+    """Full rebuild with the transaction_id range split into one shard per worker process.
+
+    Each worker opens its own read-only connection and writes its own files
+    into a shared staging directory, which is published once every shard has
+    finished. The result has the same rows, in the same order, as the serial path.
+    """
+    conn = _connect()
+    if conn is None:
+        return None, None
+    try:
+        # The watermark is read before any shard starts, so later changes are picked up by the next incremental run
+        watermark = _begin_snapshot(conn)
+        low = conn.execute(ID_BOUNDS_QUERY).fetchone()[0]
+    finally:
+        conn.close()
+
+    staging = new_staging_dir()
+    rows = 0
+    if low is not None:
+        shards = shard_ranges(low - 1, watermark['last_transaction_id'], workers)
+        tasks = [(DB_PATH, i, shard, chunk_size or SHARD_CHUNK_IDS, staging) for i, shard in enumerate(shards)]
+        print(f"Extracting transactions {low}..{watermark['last_transaction_id']} in {len(shards)} shards "
+              f"on {workers} workers...")
+        try:
+            with multiprocessing.Pool(processes=workers) as pool:
+                results = pool.map(etl_shard, tasks)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        rows = sum(r for r, _, _ in results)
+        peaks = [p for _, p, _ in results if p is not None]
+        for _, _, timings in results:
+            for stage, seconds in timings:
+                STAGE_SECONDS.observe(seconds, stage=stage)
+        print(f"Processed {rows:,} rows, peak memory per worker: {f'{max(peaks):.1f} MB' if peaks else 'n/a'}")
+
+    with STAGE_SECONDS.time(stage='publish'):
+        replace_store(staging)
+    print(f"Data saved to {STORE_PATH}.")
+    return rows, watermark
+
+def stream_pipeline(chunk_size, watermark=None):
+    """Extracts, transforms and writes the delta chunk by chunk so memory stays bounded."""
+    chunks, new_watermark = extract_chunks(chunk_size, watermark)
+    if chunks is None:
+        return None, None
+
+    # Full rebuilds go to a staging directory so readers never see a half-written store
+    staging = new_staging_dir() if watermark is None else None
+    rows = 0
+    for i, chunk in enumerate(STAGE_SECONDS.time_iter(chunks, stage='extract')):
+        with STAGE_SECONDS.time(stage='transform'):
+            clean = transform_data(chunk, verbose=False)
+        if watermark is None:
+            with STAGE_SECONDS.time(stage='load'):
+                # Named by chunk, i.e. by transaction_id: the store reads back in the same order as a serial run
+                append_features(clean, staging, basename=f"part-{i:06d}")
+        elif not clean.empty:
+            upsert_data(clean, watermark['last_transaction_id'])
+        rows += len(clean)
+        print(f"Processed chunk {i + 1} ({rows:,} rows so far).")
+
+    if staging is not None:
+        with STAGE_SECONDS.time(stage='publish'):
+            replace_store(staging)
+        print(f"Data saved to {STORE_PATH}.")
+    return rows, new_watermark
+
+def run_pipeline(full_refresh=False, chunk_size=None, workers=1):
+    watermark = None if full_refresh else load_watermark()
+    if watermark is not None and not store_exists():
+        print("Feature store missing, falling back to a full rebuild.")
+        watermark = None
+
+    start = time.perf_counter()
+    if workers > 1 and watermark is None:
+        rows, new_watermark = parallel_pipeline(workers, chunk_size)
+        if rows is None:
+            return
+    elif chunk_size:
+        rows, new_watermark = stream_pipeline(chunk_size, watermark)
+        if rows is None:
+            return
+    else:
+        df, new_watermark = extract_delta(watermark)
+        if df is None:
+            return
+
+        rows = len(df)
+        if watermark is None:
+            with STAGE_SECONDS.time(stage='transform'):
+                clean = transform_data(df)
+            load_data(clean)
+        elif df.empty:
+            print("No new or changed rows since the last run.")
+        else:
+            with STAGE_SECONDS.time(stage='transform'):
+                clean = transform_data(df)
+            upsert_data(clean, watermark['last_transaction_id'])
+
+    save_watermark(new_watermark)
+    mode = 'full' if watermark is None else 'incremental'
+    ROWS.inc(rows, mode=mode)
+
+    # Dashboard views render from these instead of the raw rows
+    if watermark is None:
+        print(f"Rebuilding rollups in {ROLLUP_PATH}...")
+        with STAGE_SECONDS.time(stage='rollups'):
+            build_rollups()
+    elif new_watermark['last_transaction_id'] > watermark['last_transaction_id'] or rollups_version() is None:
+        # Only the appended rows are aggregated and merged in (a full build if there are no rollups yet)
+        print(f"Merging new rows into the rollups in {ROLLUP_PATH}...")
+        with STAGE_SECONDS.time(stage='rollups'):
+            update_rollups()
+    else:
+        # Upserts only change `status`, which no rollup uses
+        print("No new rows; rollups are unchanged.")
+
+    elapsed = time.perf_counter() - start
+    peak_mb = peak_memory_mb()
+    print(f"ETL run: {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec), "
+          f"peak memory: {f'{peak_mb:.1f} MB' if peak_mb is not None else 'n/a'}")
+    summary_path = metrics.write_run_summary('etl', {
+        'mode': mode,
+        'chunk_size': chunk_size,
+        'workers': workers if watermark is None else 1,
+        'rows': rows,
+        'wall_s': round(elapsed, 3),
+        'rows_per_s': round(rows / max(elapsed, 1e-9), 1)
+    })
+    print(f"Run summary saved to {summary_path}")
+
 if __name__ == "__main__":
-    df = extract_data()
-    if df is not None:
-        df_clean = transform_data(df)
-        load_data(df_clean)
+    parser = argparse.ArgumentParser(description="Extract, clean and load legacy transactions.")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="Ignore the stored watermark and rebuild the output from scratch.")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Stream the extract in chunks of this many rows to keep memory bounded.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for full rebuilds, each extracting one transaction_id range "
+                             "(incremental runs stay serial).")
+    args = parser.parse_args()
+    run_pipeline(full_refresh=args.full_refresh, chunk_size=args.chunk_size, workers=args.workers)
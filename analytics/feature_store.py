@@ -0,0 +1,150 @@
+import glob
+import os
+import shutil
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_PATH = os.getenv("FEATURE_STORE_PATH", os.path.join(BASE_DIR, 'feature_store'))
+# Legacy CSV output, still read when no feature store has been built yet
+CSV_PATH = os.path.join(BASE_DIR, 'cleaned_data.csv')
+
+# Transactions are partitioned by month, e.g. feature_store/tx_month=2025-09/part-....parquet
+PARTITION_COLUMN = 'tx_month'
+COMPRESSION = 'zstd'
+
+# Typed on-disk layout of the "Analysis Ready" dataset produced by etl_process.transform_data
+CATEGORY = pa.dictionary(pa.int8(), pa.string())
+FEATURE_SCHEMA = pa.schema([
+    ('transaction_id', pa.int64()),
+    ('customer_id', pa.int32()),
+    ('amount', pa.float64()),
+    ('transaction_type', CATEGORY),
+    ('transaction_date', pa.timestamp('us')),
+    ('status', CATEGORY),
+    ('segment', CATEGORY),
+    ('account_created_date', pa.timestamp('us')),
+    ('tx_hour', pa.int8()),
+    ('tx_day_of_week', pa.int8()),
+    ('account_age_days', pa.int32()),
+    ('is_high_value', pa.int8()),
+])
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+
+def store_exists(root=None):
+    root = root or STORE_PATH
+    return os.path.isdir(root) and bool(glob.glob(os.path.join(root, '*', '*.parquet')))
+
+def data_available():
+    return store_exists() or os.path.exists(CSV_PATH)
+
+def _to_table(df):
+    table = pa.Table.from_pandas(df[FEATURE_SCHEMA.names], schema=FEATURE_SCHEMA, preserve_index=False)
+    months = pc.strftime(table['transaction_date'], format='%Y-%m')
+    return table.append_column(PARTITION_COLUMN, months)
+
+def append_features(df, root=None, basename=None):
+    """Writes `df` as new Parquet files under `root` without touching existing files.
+
+    Files are named `<basename>-<i>.parquet` in each month partition (a random
+    basename by default); readers see files in name order.
+    """
+    if df.empty:
+        return
+    basename = basename or f"part-{uuid.uuid4().hex}"
+    ds.write_dataset(
+        _to_table(df), root or STORE_PATH,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template=f"{basename}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        file_options=ds.ParquetFileFormat().make_write_options(compression=COMPRESSION)
+    )
+
+def new_staging_dir():
+    staging = f"{STORE_PATH}.staging-{uuid.uuid4().hex}"
+    os.makedirs(staging)
+    return staging
+
+def replace_store(staging):
+    """Swaps a fully written staging directory in place of the current store."""
+    old = f"{STORE_PATH}.old-{uuid.uuid4().hex}"
+    if os.path.exists(STORE_PATH):
+        os.rename(STORE_PATH, old)
+    os.rename(staging, STORE_PATH)
+    shutil.rmtree(old, ignore_errors=True)
+
+def write_features(df):
+    """Rebuilds the whole store from `df`."""
+    staging = new_staging_dir()
+    append_features(df, staging)
+    replace_store(staging)
+
+def upsert_features(df, root=None):
+    """Replaces rows with matching transaction_id; only the touched month partitions are rewritten."""
+    if df.empty:
+        return
+    root = root or STORE_PATH
+    table = _to_table(df)
+    file_schema = FEATURE_SCHEMA.remove_metadata()
+    for month in pc.unique(table[PARTITION_COLUMN]).to_pylist():
+        rows = table.filter(pc.equal(table[PARTITION_COLUMN], month)).drop_columns([PARTITION_COLUMN])
+        part_dir = os.path.join(root, f"{PARTITION_COLUMN}={month}")
+        old_files = glob.glob(os.path.join(part_dir, '*.parquet'))
+
+        if old_files:
+            existing = ds.dataset(old_files, schema=file_schema, format='parquet').to_table()
+            keep = pc.invert(pc.is_in(existing['transaction_id'], value_set=rows['transaction_id']))
+            rows = pa.concat_tables([existing.filter(keep), rows.cast(file_schema)])
+            rows = rows.sort_by('transaction_id')
+        else:
+            os.makedirs(part_dir, exist_ok=True)
+
+        # Write the merged partition before removing the files it replaces
+        pq.write_table(rows, os.path.join(part_dir, f"part-{uuid.uuid4().hex}-0.parquet"), compression=COMPRESSION)
+        for path in old_files:
+            os.remove(path)
+
+def feature_dataset(root=None):
+    return ds.dataset(root or STORE_PATH, schema=FEATURE_SCHEMA.append(pa.field(PARTITION_COLUMN, pa.string())),
+                      format='parquet', partitioning=PARTITIONING)
+
+def read_features(columns=None, filter=None):
+    """Loads only `columns` (all feature columns if None), pushing `filter` down to the Parquet scan.
+
+    `filter` is a pyarrow expression, e.g. `ds.field('tx_month') >= '2025-06'`.
+    Falls back to the legacy cleaned_data.csv when no feature store exists
+    (the partition column is not available there).
+    """
+    if store_exists():
+        columns = columns or FEATURE_SCHEMA.names
+        return feature_dataset().to_table(columns=columns, filter=filter).to_pandas()
+
+    df = pd.read_csv(CSV_PATH, usecols=columns)
+    if filter is not None:
+        df = pa.Table.from_pandas(df, preserve_index=False).filter(filter).to_pandas()
+    return df
+
+def iter_features(columns=None, batch_size=100_000, filter=None):
+    """Yields the feature data as DataFrames of at most `batch_size` rows (see read_features for `filter`)."""
+    if store_exists():
+        columns = columns or FEATURE_SCHEMA.names
+        for batch in feature_dataset().to_batches(columns=columns, filter=filter, batch_size=batch_size):
+            if batch.num_rows:
+                yield batch.to_pandas()
+        return
+
+    for chunk in pd.read_csv(CSV_PATH, usecols=columns, chunksize=batch_size):
+        if filter is not None:
+            chunk = pa.Table.from_pandas(chunk, preserve_index=False).filter(filter).to_pandas()
+        yield chunk
+
+def preview_features(n=10):
+    if store_exists():
+        return feature_dataset().head(n, columns=FEATURE_SCHEMA.names).to_pandas()
+    return pd.read_csv(CSV_PATH, nrows=n)
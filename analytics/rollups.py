@@ -0,0 +1,277 @@
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, '..'))
+ROLLUP_PATH = os.getenv("ROLLUP_PATH", os.path.join(BASE_DIR, 'rollups'))
+
+from analytics.feature_store import iter_features
+
+# Fixed-width amount buckets used for the distribution chart
+AMOUNT_BIN_WIDTH = 100.0
+# Most bars drawn for the distribution; wider amount ranges are merged into wider bins
+MAX_CHART_BINS = 512
+# Points the distribution's KDE is evaluated at, whatever the number of bins
+KDE_GRID_POINTS = 512
+
+# Rollup name -> grouping column
+ROLLUP_KEYS = {
+    'segment': 'segment',
+    'hour': 'tx_hour',
+    'day_of_week': 'tx_day_of_week',
+    'date': 'tx_date',
+    'amount_bin': 'amount_bin',
+}
+# Raw columns needed to build every rollup
+ROLLUP_COLUMNS = ['segment', 'tx_hour', 'tx_day_of_week', 'transaction_date', 'amount', 'is_high_value']
+# Highest transaction_id folded into the materialized rollups, written next to them
+STATE_NAME = 'state.json'
+
+# Typed parsing for uploaded CSVs; categories keep each chunk small
+CSV_DTYPES = {
+    'segment': 'category',
+    'transaction_type': 'category',
+    'status': 'category',
+}
+# Numeric columns, converted per chunk by coerce_numeric: blank cells become missing
+# values (nullable ints), anything else that does not fit the type is an error
+CSV_NUMERIC = {
+    'amount': 'float64',
+    'tx_hour': 'Int8',
+    'tx_day_of_week': 'Int8',
+    'is_high_value': 'Int8',
+}
+
+def compute_rollups(df):
+    """Aggregates `df` into one small DataFrame per rollup key.
+
+    Each rollup holds count, sum, sum of squares, min and max of `amount`
+    plus the number of high value transactions, so partial rollups can be
+    merged and means/variances derived without the raw rows.
+    """
+    df = df.assign(
+        tx_date=pd.to_datetime(df['transaction_date']).dt.normalize(),
+        amount_bin=np.floor(df['amount'] / AMOUNT_BIN_WIDTH) * AMOUNT_BIN_WIDTH,
+        amount_sq=df['amount'] ** 2,
+    )
+    if isinstance(df['segment'].dtype, pd.CategoricalDtype):
+        df['segment'] = df['segment'].astype(str)
+
+    rollups = {}
+    for name, key in ROLLUP_KEYS.items():
+        grouped = df.groupby(key, sort=True)
+        rollups[name] = pd.DataFrame({
+            'count': grouped['amount'].count(),
+            'amount_sum': grouped['amount'].sum(),
+            'amount_sumsq': grouped['amount_sq'].sum(),
+            'amount_min': grouped['amount'].min(),
+            'amount_max': grouped['amount'].max(),
+            'high_value_count': grouped['is_high_value'].sum(),
+        }).reset_index()
+    return rollups
+
+def merge_rollups(left, right):
+    """Combines two sets of partial rollups (e.g. from consecutive chunks)."""
+    if left is None:
+        return right
+    return {name: _combine(pd.concat([left[name], right[name]], ignore_index=True), key)
+            for name, key in ROLLUP_KEYS.items()}
+
+def _combine(rollup, key):
+    # One row per `key`, summing the partial rows that share it
+    return rollup.groupby(key, sort=True).agg(
+        count=('count', 'sum'),
+        amount_sum=('amount_sum', 'sum'),
+        amount_sumsq=('amount_sumsq', 'sum'),
+        amount_min=('amount_min', 'min'),
+        amount_max=('amount_max', 'max'),
+        high_value_count=('high_value_count', 'sum'),
+    ).reset_index()
+
+def add_statistics(rollup):
+    """Adds mean, standard deviation and a 95% confidence interval of the mean."""
+    count = rollup['count']
+    mean = rollup['amount_sum'] / count
+    variance = (rollup['amount_sumsq'] / count - mean ** 2).clip(lower=0) * count / (count - 1).clip(lower=1)
+    std = np.sqrt(variance)
+    margin = 1.96 * std / np.sqrt(count)
+    return rollup.assign(amount_mean=mean, amount_std=std, ci_low=mean - margin, ci_high=mean + margin)
+
+def totals(rollups):
+    segment = rollups['segment']
+    count = int(segment['count'].sum())
+    amount_sum = float(segment['amount_sum'].sum())
+    return {
+        'count': count,
+        'amount_sum': amount_sum,
+        'amount_mean': amount_sum / count if count else 0.0,
+        'high_value_count': int(segment['high_value_count'].sum()),
+    }
+
+def coarsen_amount_bins(amount_bins, max_bins=MAX_CHART_BINS):
+    """Merges adjacent amount bins so that at most `max_bins` cover the range.
+
+    Returns (bins, bin width); the width is a multiple of AMOUNT_BIN_WIDTH.
+    """
+    low, high = amount_bins['amount_bin'].min(), amount_bins['amount_bin'].max()
+    factor = int(np.ceil(((high - low) / AMOUNT_BIN_WIDTH + 1) / max_bins))
+    if factor <= 1:
+        return amount_bins, AMOUNT_BIN_WIDTH
+    width = factor * AMOUNT_BIN_WIDTH
+    merged = amount_bins.assign(amount_bin=low + np.floor((amount_bins['amount_bin'] - low) / width) * width)
+    return _combine(merged, 'amount_bin'), width
+
+def binned_kde(amount_bins, bin_width=AMOUNT_BIN_WIDTH, grid_points=KDE_GRID_POINTS):
+    """Approximate KDE of `amount` on a grid of at most `grid_points`, scaled to counts per bin.
+
+    Each bin's count is put on the grid point nearest its centre and the
+    grid is convolved with a Gaussian kernel, so the cost depends on the
+    grid and not on the number of bins. The bandwidth follows Scott's rule
+    using the variance recovered from the rollup sums.
+    """
+    stats = add_statistics(pd.DataFrame(amount_bins[['count', 'amount_sum', 'amount_sumsq']].sum()).T)
+    n, std = stats['count'].iloc[0], stats['amount_std'].iloc[0]
+    centres = amount_bins['amount_bin'].to_numpy() + bin_width / 2
+    bandwidth = max(1.06 * std * n ** (-1 / 5), bin_width / 2)
+
+    # 1. Bin counts on a regular grid over the bin centres
+    low, span = centres.min(), centres.max() - centres.min()
+    step = span / (grid_points - 1) if span else bin_width
+    points = int(round(span / step)) + 1
+    grid = low + step * np.arange(points)
+    counts = np.bincount(np.rint((centres - low) / step).astype(np.int64),
+                         weights=amount_bins['count'].to_numpy(np.float64), minlength=points)
+
+    # 2. Gaussian kernel out to 4 bandwidths (never wider than the grid)
+    half = min(int(np.ceil(4 * bandwidth / step)), points - 1)
+    kernel = np.exp(-0.5 * (np.arange(-half, half + 1) * step / bandwidth) ** 2)
+    density = np.convolve(counts, kernel)[half:half + points] / (n * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density * n * bin_width
+
+def reservoir_sample(sample, chunk, size, rng, offset=0):
+    """Folds `chunk` into a uniform random sample of at most `size` rows of the stream seen so far.
+
+    Every row gets a random key and the rows with the smallest keys are kept,
+    which is a uniform sample of the whole stream however it is chunked.
+    """
+    chunk = chunk.assign(_key=rng.random(len(chunk)), _row=np.arange(offset, offset + len(chunk)))
+    merged = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+    return merged.nsmallest(size, '_key')
+
+def coerce_numeric(chunk):
+    """Converts the CSV_NUMERIC columns of a parsed CSV chunk to their types.
+
+    Raises ValueError naming the column, value and line of the first value
+    that is not a number or does not fit the (integer) type.
+    """
+    for column, dtype in CSV_NUMERIC.items():
+        raw = chunk[column]
+        values = pd.to_numeric(raw, errors='coerce')
+        invalid = values.isna() & raw.notna()
+        if dtype != 'float64':
+            limits = np.iinfo(pd.api.types.pandas_dtype(dtype).numpy_dtype)
+            filled = values.fillna(0)
+            invalid |= (filled % 1 != 0) | (filled < limits.min) | (filled > limits.max)
+        if invalid.any():
+            # Chunks keep the file's row numbers; line 1 is the header
+            raise ValueError(f"column '{column}' has an invalid value '{raw[invalid].iloc[0]}' "
+                             f"on line {invalid.idxmax() + 2}")
+        chunk[column] = values.astype(dtype)
+    return chunk
+
+def summarize_csv(source, chunk_size=200_000, sample_size=1_000, seed=42):
+    """Streams a CSV in typed chunks into rollups plus a random sample of its rows.
+
+    Only one chunk is parsed at a time, so memory is bounded by `chunk_size`
+    rather than by the file size. Returns (rollups, sample, row count).
+    Raises ValueError when a rollup column is missing or holds an invalid value.
+    """
+    rng = np.random.default_rng(seed)
+    rollups, sample, rows = None, None, 0
+    for chunk in pd.read_csv(source, dtype=CSV_DTYPES, chunksize=chunk_size):
+        missing = [column for column in ROLLUP_COLUMNS if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"missing column(s) {', '.join(missing)}")
+        chunk = coerce_numeric(chunk)
+        rollups = merge_rollups(rollups, compute_rollups(chunk[ROLLUP_COLUMNS]))
+        if sample_size:
+            sample = reservoir_sample(sample, chunk, sample_size, rng, offset=rows)
+        rows += len(chunk)
+
+    if sample is not None:
+        # Back in file order
+        sample = sample.sort_values('_row').drop(columns=['_key', '_row']).reset_index(drop=True)
+    return rollups, sample, rows
+
+def _scan_rollups(batch_size, filter=None):
+    # Rollups of the (filtered) feature store and the highest transaction_id they include
+    rollups, last_transaction_id = None, None
+    for batch in iter_features(columns=ROLLUP_COLUMNS + ['transaction_id'], batch_size=batch_size, filter=filter):
+        rollups = merge_rollups(rollups, compute_rollups(batch))
+        last_transaction_id = max(last_transaction_id or 0, int(batch['transaction_id'].max()))
+    return rollups, last_transaction_id
+
+def save_rollups(rollups, last_transaction_id):
+    os.makedirs(ROLLUP_PATH, exist_ok=True)
+    for name, table in rollups.items():
+        path = os.path.join(ROLLUP_PATH, f"{name}.parquet")
+        tmp_path = f"{path}.tmp"
+        table.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    # Written last: the rollups on disk always include at least the rows up to this id
+    state_path = os.path.join(ROLLUP_PATH, STATE_NAME)
+    with open(f"{state_path}.tmp", 'w') as f:
+        json.dump({'last_transaction_id': last_transaction_id}, f)
+    os.replace(f"{state_path}.tmp", state_path)
+
+def load_rollup_state():
+    path = os.path.join(ROLLUP_PATH, STATE_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def build_rollups(batch_size=100_000):
+    """Scans the feature store batch by batch and materializes every rollup to ROLLUP_PATH."""
+    rollups, last_transaction_id = _scan_rollups(batch_size)
+    if rollups is None:
+        return None
+    save_rollups(rollups, last_transaction_id)
+    return rollups
+
+def update_rollups(batch_size=100_000):
+    """Folds rows appended to the feature store since the last build or update into the stored rollups.
+
+    Only rows with a transaction_id above the stored state are read (the
+    filter skips whole row groups by their statistics). Rows that were
+    upserted in place are not re-read: the legacy batch only changes
+    `status`, which no rollup uses. Falls back to a full build when there
+    are no rollups or no state yet.
+    """
+    state, current = load_rollup_state(), load_rollups()
+    if state is None or current is None:
+        return build_rollups(batch_size)
+
+    new, last_transaction_id = _scan_rollups(batch_size, ds.field('transaction_id') > state['last_transaction_id'])
+    if new is None:
+        return current
+    rollups = merge_rollups(current, new)
+    save_rollups(rollups, last_transaction_id)
+    return rollups
+
+def rollups_version():
+    """Modification time of the materialized rollups (None if not built yet)."""
+    paths = [os.path.join(ROLLUP_PATH, f"{name}.parquet") for name in ROLLUP_KEYS]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    return max(os.path.getmtime(path) for path in paths)
+
+def load_rollups():
+    if rollups_version() is None:
+        return None
+    return {name: pd.read_parquet(os.path.join(ROLLUP_PATH, f"{name}.parquet")) for name in ROLLUP_KEYS}
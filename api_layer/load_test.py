@@ -0,0 +1,82 @@
+import argparse
+import json
+import random
+import threading
+import time
+import numpy as np
+import requests
+
+API_URL = "http://localhost:8000"
+
+def random_payload(rng, distinct_ages):
+    return {
+        "tx_hour": rng.randrange(24),
+        "tx_day_of_week": rng.randrange(7),
+        "account_age_days": rng.randrange(distinct_ages),
+        "amount": round(rng.uniform(1, 1000), 2)
+    }
+
+def worker(url, endpoint, deadline, distinct_ages, seed, latencies, errors):
+    rng = random.Random(seed)
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        payload = random_payload(rng, distinct_ages)
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{url}{endpoint}", json=payload, timeout=10)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(1)
+
+def run_load_test(url=API_URL, endpoint="/predict/risk", concurrency=16, duration=10.0, distinct_ages=3650):
+    """Keeps `concurrency` clients busy for `duration` seconds and reports latency percentiles and throughput."""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=worker, args=(url, endpoint, deadline, distinct_ages, i, latencies, errors))
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else None,
+        "p95_ms": float(np.percentile(ms, 95)) if len(ms) else None,
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else None,
+        "max_ms": float(ms.max()) if len(ms) else None
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test for the prediction API.")
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--endpoint", default="/predict/risk")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent clients.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run.")
+    parser.add_argument("--distinct-ages", type=int, default=3650,
+                        help="Range of account_age_days values; lower it to exercise the prediction cache.")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    args = parser.parse_args()
+
+    result = run_load_test(args.url, args.endpoint, args.concurrency, args.duration, args.distinct_ages)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"{result['endpoint']} with {result['concurrency']} clients: {result['requests']} requests, "
+              f"{result['errors']} errors, {result['rps']:.0f} req/s")
+        if result['requests']:
+            print(f"Latency p50 {result['p50_ms']:.1f} ms | p95 {result['p95_ms']:.1f} ms | "
+                  f"p99 {result['p99_ms']:.1f} ms | max {result['max_ms']:.1f} ms")
@@ -1,28 +1,315 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-import pickle
-import pandas as pd
+from typing import List, Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import uvicorn
+import threading
+import time
+import sys
 import os
 
-app = FastAPI(title="Intelligent Analytics API", description="API for predicting customer risk and demand.")
+@asynccontextmanager
+async def lifespan(app):
+    # Runs in each worker process, i.e. after serve.py has forked.
+    # Models are loaded before the first request instead of by it.
+    for name, features in SERVED_MODELS.items():
+        check_model_features(registry.predictor(name), features)
+    start_model_watcher()
+    yield
+
+app = FastAPI(title="Intelligent Analytics API", description="API for predicting customer risk and demand.",
+              lifespan=lifespan)
 
 # Load Models
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_DIR = os.path.join(BASE_DIR, '../ml_core/models')
-try:
-    with open(f'{MODEL_DIR}/logistic_regression.pkl', 'rb') as f:
-        lr_model = pickle.load(f)
-    with open(f'{MODEL_DIR}/random_forest.pkl', 'rb') as f:
-        rf_model = pickle.load(f)
-    with open(f'{MODEL_DIR}/kmeans.pkl', 'rb') as f:
-        kmeans_model = pickle.load(f)
-    print("Models loaded successfully.")
-except FileNotFoundError:
+sys.path.append(os.path.join(BASE_DIR, '..'))
+
+from analytics.features import RISK_FEATURES, SEGMENT_FEATURES, FeatureBuffer, check_model_features, unnamed_features
+from ml_core.registry import ModelRegistry, registry_signature
+from monitoring import metrics
+
+# Models are memory-mapped and loaded lazily on first use, so the random
+# forest (not used for inference here) is never loaded by the API. Versions
+# with compiled NumPy engines are served from those, without loading sklearn.
+# `registry` is replaced as a whole when a new version is published; handlers
+# read it once per request, so in-flight requests finish on the old version.
+registry = ModelRegistry()
+if registry.available('lr') and registry.available('kmeans'):
+    print(f"Model registry version {registry.version} found.")
+else:
     print("Models not found. Please run train_models.py first.")
-    lr_model = None
-    rf_model = None
-    kmeans_model = None
+
+# Served models and the feature order their inputs are built in
+SERVED_MODELS = {'lr': RISK_FEATURES, 'kmeans': SEGMENT_FEATURES}
+# How often each worker checks the model directory for a newly published version
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "5"))
+reload_lock = threading.Lock()
+reload_status = {"last_reload_at": None, "last_error": None}
+
+# Metrics are per worker process; scrape each worker (or sum them) when running serve.py
+REQUEST_SECONDS = metrics.histogram(
+    'api_request_seconds', 'End-to-end HTTP request latency.', ['method', 'route', 'status'])
+PREDICT_PHASE_SECONDS = metrics.histogram(
+    'api_predict_phase_seconds', 'Time per /predict phase (features, model, serialize).', ['endpoint', 'phase'])
+PREDICTIONS = metrics.counter(
+    'api_predictions_total', 'Single-row predictions by source (cache or model).', ['endpoint', 'source'])
+MODEL_CALL_SECONDS = metrics.histogram(
+    'api_model_call_seconds', 'Duration of one vectorized model call.', ['model'])
+MODEL_CALL_ROWS = metrics.histogram(
+    'api_model_call_rows', 'Rows scored per model call.', ['model'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 10000))
+CACHE_STATS = metrics.gauge('api_prediction_cache', 'Prediction cache statistics.', ['stat'])
+MODEL_INFO = metrics.gauge('api_model_info', 'Model registry version being served.', ['version'])
+
+class RequestTimer:
+    """ASGI middleware recording the latency of every HTTP request by route and status."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the shared scope; unmatched paths are grouped
+            route = scope.get('route')
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope['method'],
+                                    route=getattr(route, 'path', 'unmatched'), status=status[0])
+
+app.add_middleware(RequestTimer)
+
+RISK_THRESHOLD = 0.5
+
+# Upper bound on rows per batch request; larger backlogs are sent in several chunks
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
+
+# Single-row inputs are low-cardinality and repeat heavily, so their results are cached
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "50000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+
+class PredictionCache:
+    """Thread-safe LRU cache with a time-to-live.
+
+    Keys include the registry version, so entries computed by a previous
+    model version are never returned once new models are loaded.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+
+# Single-row requests arriving within this window are scored together in one predict call
+MICRO_BATCH_WINDOW_MS = float(os.getenv("MICRO_BATCH_WINDOW_MS", "2"))
+MICRO_BATCH_MAX_ROWS = int(os.getenv("MICRO_BATCH_MAX_ROWS", "256"))
+# sklearn does its heavy lifting in NumPy/BLAS, which releases the GIL, so plain threads suffice
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", str(min(4, os.cpu_count() or 1))))
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix="inference")
+
+# Model inputs are written into per-thread preallocated arrays instead of a DataFrame per call
+risk_input = FeatureBuffer(RISK_FEATURES, capacity=MICRO_BATCH_MAX_ROWS)
+segment_input = FeatureBuffer(SEGMENT_FEATURES, capacity=MICRO_BATCH_MAX_ROWS)
+
+class MicroBatcher:
+    """Collects concurrent single-row requests into one vectorized predict call.
+
+    The first queued row opens a window of `window_ms`; everything that
+    arrives before it closes (up to `max_rows`) is scored in one call of
+    `predict_fn(model, rows) -> results` on the inference executor, so the
+    event loop never blocks on sklearn and per-call overhead is paid once per
+    batch. Rows are always scored by the model object they were submitted with.
+    """
+
+    def __init__(self, predict_fn, window_ms=MICRO_BATCH_WINDOW_MS, max_rows=MICRO_BATCH_MAX_ROWS,
+                 executor=inference_executor):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self.executor = executor
+        self._loop = None
+        self._queue = None
+        # The event loop only keeps weak references to tasks; these strong ones stop a
+        # pending collector or batch from being garbage-collected with its futures unresolved
+        self._collector = None
+        self._scoring = set()
+
+    def _start(self, loop):
+        # Bound to the running event loop; restarted if the loop changes (e.g. a new test client)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._collector = loop.create_task(self._collect())
+
+    async def submit(self, model, row):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start(loop)
+        future = loop.create_future()
+        self._queue.put_nowait((model, row, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_rows:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Scored in the background so the next window can open while this batch runs
+            task = loop.create_task(self._score(batch))
+            self._scoring.add(task)
+            task.add_done_callback(self._scoring.discard)
+
+    async def _score(self, batch):
+        # A batch only spans two models while a reload is being swapped in
+        groups = {}
+        for model, row, future in batch:
+            groups.setdefault(id(model), (model, []))[1].append((row, future))
+
+        loop = asyncio.get_running_loop()
+        for model, items in groups.values():
+            rows = [row for row, _ in items]
+            try:
+                results = await loop.run_in_executor(self.executor, self.predict_fn, model, rows)
+            except Exception as exc:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+
+def score_risk_rows(lr_model, rows):
+    MODEL_CALL_ROWS.observe(len(rows), model='lr')
+    with MODEL_CALL_SECONDS.time(model='lr'), unnamed_features(lr_model):
+        probs = lr_model.predict_proba(risk_input.fill(rows))[:, 1]
+    # Same decision as lr_model.predict, derived from the probability instead of a second model call
+    return [{"risk_score": float(p), "is_high_risk": bool(p > RISK_THRESHOLD)} for p in probs]
+
+def score_segment_rows(kmeans_model, rows):
+    MODEL_CALL_ROWS.observe(len(rows), model='kmeans')
+    with MODEL_CALL_SECONDS.time(model='kmeans'), unnamed_features(kmeans_model):
+        clusters = kmeans_model.predict(segment_input.fill(rows))
+    return [{"segment_cluster": int(c)} for c in clusters]
+
+risk_batcher = MicroBatcher(score_risk_rows)
+segment_batcher = MicroBatcher(score_segment_rows)
+
+def reload_models(force=False):
+    """Loads the currently published model version and swaps it in atomically.
+
+    The new registry is fully loaded (and memory-mapped) before the swap, so
+    no request pays the load cost. If the new models are missing or fail to
+    load, the current ones keep serving.
+    """
+    global registry
+    with reload_lock:
+        current = registry
+        if not force and registry_signature(current.model_dir) == current.signature:
+            return {"reloaded": False, "version": current.version}
+
+        candidate = ModelRegistry(current.model_dir, current.mmap_mode)
+        try:
+            # 1. Pre-warm every served model and check it takes the inputs we build
+            missing = [name for name in SERVED_MODELS if candidate.predictor(name) is None]
+            if missing:
+                raise FileNotFoundError(f"Models not found: {', '.join(missing)}")
+            for name, features in SERVED_MODELS.items():
+                check_model_features(candidate.predictor(name), features)
+        except Exception as exc:
+            reload_status["last_error"] = f"{candidate.version}: {exc}"
+            print(f"Model reload failed, still serving {current.version}: {exc}")
+            return {"reloaded": False, "version": current.version, "error": str(exc)}
+
+        # 2. Swap; requests that already hold `current` finish on it
+        registry = candidate
+        prediction_cache.clear()
+        reload_status.update(last_reload_at=time.strftime('%Y-%m-%dT%H:%M:%S'), last_error=None)
+        print(f"Model registry version {candidate.version} loaded (was {current.version}).")
+        return {"reloaded": True, "version": candidate.version, "previous_version": current.version}
+
+def watch_models(interval=MODEL_POLL_SECONDS):
+    last_failed = None
+    while True:
+        time.sleep(interval)
+        signature = registry_signature(registry.model_dir)
+        if signature == registry.signature or signature == last_failed:
+            continue
+        result = reload_models()
+        last_failed = signature if result.get("error") else None
+
+def start_model_watcher():
+    if MODEL_POLL_SECONDS > 0:
+        threading.Thread(target=watch_models, name="model-watcher", daemon=True).start()
 
 class TransactionInput(BaseModel):
     tx_hour: int
@@ -30,37 +317,181 @@ class TransactionInput(BaseModel):
     account_age_days: int
     amount: float
 
+class TransactionColumns(BaseModel):
+    tx_hour: List[int]
+    tx_day_of_week: List[int]
+    account_age_days: List[int]
+    amount: List[float]
+
+class TransactionBatchInput(BaseModel):
+    # Either a list of row objects or one list per column (columnar payload)
+    rows: Optional[List[TransactionInput]] = None
+    columns: Optional[TransactionColumns] = None
+
+def batch_to_columns(batch):
+    """Converts a batch payload into one list per field (and the row count) so models score it in one call."""
+    if (batch.rows is None) == (batch.columns is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of 'rows' or 'columns'.")
+
+    fields = ['tx_hour', 'tx_day_of_week', 'account_age_days', 'amount']
+    if batch.rows is not None:
+        data = {name: [getattr(row, name) for row in batch.rows] for name in fields}
+    else:
+        data = {name: getattr(batch.columns, name) for name in fields}
+
+    lengths = {len(values) for values in data.values()}
+    if len(lengths) != 1:
+        raise HTTPException(status_code=422, detail="All columns must have the same length.")
+    n_rows = lengths.pop()
+    if n_rows > MAX_BATCH_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {n_rows} rows exceeds the limit of {MAX_BATCH_ROWS}; split it into chunks."
+        )
+    return data, n_rows
+
+def respond(endpoint, result):
+    # Rendered here instead of by FastAPI, so that serialization shows up as its own phase
+    with PREDICT_PHASE_SECONDS.time(endpoint=endpoint, phase='serialize'):
+        return JSONResponse(result)
+
 @app.get("/")
 def home():
     return {"message": "Intelligent Analytics API is running."}
 
-@app.post("/predict/risk")
-def predict_risk(data: TransactionInput):
+@app.get("/metrics")
+def prometheus_metrics():
+    for stat, value in prediction_cache.stats().items():
+        CACHE_STATS.set(value, stat=stat)
+    MODEL_INFO.clear()
+    MODEL_INFO.set(1, version=registry.version)
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {"model_version": registry.version, **prediction_cache.stats()}
+
+@app.get("/admin/model")
+def active_model():
+    models = registry
+    manifest = models.manifest or {}
+    return {
+        "version": models.version,
+        "created_at": manifest.get("created_at"),
+        "training_data_hash": manifest.get("training_data_hash"),
+        "loaded": models.loaded(),
+        **reload_status
+    }
+
+@app.post("/admin/reload")
+def trigger_reload(force: bool = False):
+    return reload_models(force=force)
+
+async def score_risk(models, data, endpoint):
+    """Risk score of one transaction, from the prediction cache or the micro-batcher."""
+    lr_model = models.predictor('lr')
     if not lr_model:
         raise HTTPException(status_code=500, detail="Model not loaded.")
-    
-    # Prepare features for LR/RF (excluding amount if not used, but check training script)
+
     # Training used: ['tx_hour', 'tx_day_of_week', 'account_age_days']
-    features = [[data.tx_hour, data.tx_day_of_week, data.account_age_days]]
-    
-    risk_prob = lr_model.predict_proba(features)[0][1] # Probability of 'is_high_value' (or risk class)
-    prediction = lr_model.predict(features)[0]
+    with PREDICT_PHASE_SECONDS.time(endpoint=endpoint, phase='features'):
+        features = risk_input.row(data)
+    cache_key = ('lr', models.version) + features
+    cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        PREDICTIONS.inc(endpoint=endpoint, source='cache')
+        return cached
     
-    return {
-        "risk_score": float(risk_prob),
-        "is_high_risk": bool(prediction) # In our proxy, high value might be high priority/risk depending on definition
-    }
+    # risk_score is the probability of 'is_high_value' (or risk class); in our proxy,
+    # high value might be high priority/risk depending on definition
+    with PREDICT_PHASE_SECONDS.time(endpoint=endpoint, phase='model'):
+        result = await risk_batcher.submit(lr_model, features)
+    PREDICTIONS.inc(endpoint=endpoint, source='model')
+    if models is registry:
+        prediction_cache.put(cache_key, result)
+    return result
 
-@app.post("/predict/segment")
-def predict_segment(data: TransactionInput):
+async def score_segment(models, data, endpoint):
+    """Segment cluster of one transaction, from the prediction cache or the micro-batcher."""
+    kmeans_model = models.predictor('kmeans')
     if not kmeans_model:
         raise HTTPException(status_code=500, detail="Model not loaded.")
-    
+
     # Training used: ['amount', 'tx_hour']
-    features = [[data.amount, data.tx_hour]]
-    cluster = kmeans_model.predict(features)[0]
+    with PREDICT_PHASE_SECONDS.time(endpoint=endpoint, phase='features'):
+        features = segment_input.row(data)
+    cache_key = ('kmeans', models.version) + features
+    cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        PREDICTIONS.inc(endpoint=endpoint, source='cache')
+        return cached
     
-    return {"segment_cluster": int(cluster)}
+    with PREDICT_PHASE_SECONDS.time(endpoint=endpoint, phase='model'):
+        result = await segment_batcher.submit(kmeans_model, features)
+    PREDICTIONS.inc(endpoint=endpoint, source='model')
+    if models is registry:
+        prediction_cache.put(cache_key, result)
+    return result
+
+@app.post("/predict")
+async def predict(data: TransactionInput):
+    """Risk and segment of one transaction in a single round trip."""
+    models = registry
+    # Both models score concurrently, on the same model version
+    risk, segment = await asyncio.gather(score_risk(models, data, 'predict'), score_segment(models, data, 'predict'))
+    return respond('predict', {**risk, **segment, "model_version": models.version})
+
+@app.post("/predict/risk")
+async def predict_risk(data: TransactionInput):
+    return respond('risk', await score_risk(registry, data, 'risk'))
+
+@app.post("/predict/risk/batch")
+def predict_risk_batch(batch: TransactionBatchInput):
+    lr_model = registry.predictor('lr')
+    if not lr_model:
+        raise HTTPException(status_code=500, detail="Model not loaded.")
+
+    with PREDICT_PHASE_SECONDS.time(endpoint='risk_batch', phase='features'):
+        data, n_rows = batch_to_columns(batch)
+        if n_rows:
+            X = risk_input.fill_columns(data, n_rows)
+    if not n_rows:
+        return {"count": 0, "risk_score": [], "is_high_risk": []}
+
+    # One vectorized predict_proba call for the whole batch
+    with PREDICT_PHASE_SECONDS.time(endpoint='risk_batch', phase='model'), unnamed_features(lr_model):
+        risk_prob = lr_model.predict_proba(X)[:, 1]
+
+    return respond('risk_batch', {
+        "count": n_rows,
+        "risk_score": risk_prob.tolist(),
+        "is_high_risk": (risk_prob > RISK_THRESHOLD).tolist()
+    })
+
+@app.post("/predict/segment")
+async def predict_segment(data: TransactionInput):
+    return respond('segment', await score_segment(registry, data, 'segment'))
+
+@app.post("/predict/segment/batch")
+def predict_segment_batch(batch: TransactionBatchInput):
+    kmeans_model = registry.predictor('kmeans')
+    if not kmeans_model:
+        raise HTTPException(status_code=500, detail="Model not loaded.")
+
+    with PREDICT_PHASE_SECONDS.time(endpoint='segment_batch', phase='features'):
+        data, n_rows = batch_to_columns(batch)
+        if n_rows:
+            X = segment_input.fill_columns(data, n_rows)
+    if not n_rows:
+        return {"count": 0, "segment_cluster": []}
+
+    with PREDICT_PHASE_SECONDS.time(endpoint='segment_batch', phase='model'), unnamed_features(kmeans_model):
+        clusters = kmeans_model.predict(X)
+
+    return respond('segment_batch', {
+        "count": n_rows,
+        "segment_cluster": clusters.tolist()
+    })
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,71 @@
+import argparse
+import os
+import signal
+import socket
+import sys
+import uvicorn
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+
+WORKERS = int(os.getenv("API_WORKERS", str(os.cpu_count() or 1)))
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def serve(host="0.0.0.0", port=8000, workers=WORKERS):
+    """Loads the models once, then forks `workers` uvicorn processes sharing them.
+
+    Each worker has its own event loop, micro-batchers and inference threads,
+    so throughput scales past the GIL with the number of cores. The model
+    pages are shared copy-on-write (memory-mapped for registry versions)
+    instead of being loaded again in every worker, as `uvicorn --workers` would.
+    """
+    from main import app, registry, SERVED_MODELS
+
+    # 1. Load models in the parent so every worker inherits them
+    for name in SERVED_MODELS:
+        registry.predictor(name)
+    print(f"Loaded {registry.loaded()} (version {registry.version}); starting {workers} workers on {host}:{port}")
+
+    if workers <= 1 or not hasattr(os, 'fork'):
+        uvicorn.run(app, host=host, port=port)
+        return
+
+    # 2. Bind once; all workers accept on the same listening socket
+    sock = bind_socket(host, port)
+    config = uvicorn.Config(app, host=host, port=port)
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        children.append(pid)
+
+    # 3. Forward shutdown signals and wait for the workers to exit
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in children:
+        os.waitpid(pid, 0)
+    sock.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the prediction API with several worker processes.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Worker processes (default: API_WORKERS or CPU count).")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
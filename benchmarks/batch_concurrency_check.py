@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, '..'))
+
+from analytics.etl_process import EXTRACT_QUERY, RANGE_FILTER
+from database.seed_data import init_db, generate_data_bulk
+from legacy_app.batch_processor import DEFAULT_CHUNK_SIZE, PENDING_COUNT_QUERY, connect, process_transactions
+
+MAX_ID_QUERY = "SELECT MAX(transaction_id) FROM transactions"
+# The single statement BatchProcessor.java runs over the whole backlog
+UNBOUNDED_UPDATE = "UPDATE transactions SET status = 'PROCESSED', processed_at = CURRENT_TIMESTAMP WHERE status = 'PENDING'"
+# Python's sqlite3 default, as used by etl_process.py
+READER_TIMEOUT_SECONDS = 5.0
+# Rows per extract: the reader walks the table in primary-key ranges, like chunked ETL and batch scoring
+READ_RANGE_ROWS = 10_000
+
+def seed_database(path, rows, seed=42):
+    conn = sqlite3.connect(path)
+    try:
+        init_db(conn)
+        generate_data_bulk(conn, num_customers=1_000, num_transactions=rows, seed=seed)
+    finally:
+        conn.close()
+
+def prepare(base_path, work_path, journal_mode, pending_every):
+    """Copies the base database and puts every `pending_every`-th transaction back into the PENDING backlog."""
+    shutil.copyfile(base_path, work_path)
+    conn = sqlite3.connect(work_path, isolation_level=None)
+    try:
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        conn.execute("UPDATE transactions SET status = 'PENDING', processed_at = NULL WHERE transaction_id % ? = 0",
+                     (pending_every,))
+        return conn.execute(PENDING_COUNT_QUERY).fetchone()[0], conn.execute(MAX_ID_QUERY).fetchone()[0]
+    finally:
+        conn.close()
+
+def run_unbounded(path):
+    # Rollback journal and the default connection settings, like the legacy job
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        return conn.execute(UNBOUNDED_UPDATE).rowcount
+    finally:
+        conn.close()
+
+def run_chunked(path, chunk_size):
+    conn = connect(path)
+    try:
+        return process_transactions(conn, chunk_size)
+    finally:
+        conn.close()
+
+def etl_reader(path, stop, results, timeout, max_id):
+    """Extracts consecutive id ranges until `stop` is set, recording each extract's latency and any lock errors."""
+    low = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        conn = sqlite3.connect(path, timeout=timeout)
+        try:
+            pd.read_sql_query(EXTRACT_QUERY + RANGE_FILTER, conn, params=(low, low + READ_RANGE_ROWS))
+            results['extracts'].append(time.perf_counter() - start)
+        except (sqlite3.OperationalError, pd.errors.DatabaseError) as e:
+            # pandas re-raises sqlite3 errors as its own DatabaseError
+            results['errors'].append(str(e))
+        finally:
+            conn.close()
+        low = (low + READ_RANGE_ROWS) % max_id
+
+def check_mode(mode, base_path, work_dir, pending_every, chunk_size, reader_timeout):
+    path = os.path.join(work_dir, f"{mode}.db")
+    pending, max_id = prepare(base_path, path, 'DELETE' if mode == 'unbounded' else 'WAL', pending_every)
+
+    stop = threading.Event()
+    readers = {'extracts': [], 'errors': []}
+    reader = threading.Thread(target=etl_reader, args=(path, stop, readers, reader_timeout, max_id), daemon=True)
+    reader.start()
+    # The batch starts while the ETL is already extracting
+    time.sleep(0.5)
+
+    start = time.perf_counter()
+    writer_error = None
+    try:
+        processed = run_unbounded(path) if mode == 'unbounded' else run_chunked(path, chunk_size)
+    except sqlite3.OperationalError as e:
+        processed, writer_error = 0, str(e)
+    writer_s = time.perf_counter() - start
+    stop.set()
+    reader.join()
+
+    extracts = readers['extracts']
+    return {
+        'mode': mode,
+        'pending': pending,
+        'processed': processed,
+        'writer_s': round(writer_s, 3),
+        'writer_error': writer_error,
+        'extracts': len(extracts),
+        'extract_p50_ms': round(statistics.median(extracts) * 1000, 1) if extracts else None,
+        'extract_max_ms': round(max(extracts) * 1000, 1) if extracts else None,
+        'reader_lock_errors': sum('locked' in error for error in readers['errors']),
+    }
+
+def run_check(db_path=None, rows=1_000_000, pending_every=2, chunk_size=DEFAULT_CHUNK_SIZE,
+              reader_timeout=READER_TIMEOUT_SECONDS):
+    work_dir = tempfile.mkdtemp(prefix='batch_concurrency_')
+    try:
+        base_path = db_path
+        if base_path is None:
+            base_path = os.path.join(work_dir, 'base.db')
+            seed_database(base_path, rows)
+        return [check_mode(mode, base_path, work_dir, pending_every, chunk_size, reader_timeout)
+                for mode in ('unbounded', 'chunked')]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the nightly batch while the ETL extracts, unbounded (legacy) vs chunked, and count lock errors.")
+    parser.add_argument("--db", default=None, help="Database to copy for each run (default: seed a scratch one).")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Transactions to seed when --db is not given.")
+    parser.add_argument("--pending-every", type=int, default=2,
+                        help="Every Nth transaction is reset to PENDING before each run.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--reader-timeout", type=float, default=READER_TIMEOUT_SECONDS,
+                        help="Seconds an extract waits for a lock before 'database is locked'.")
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = run_check(args.db, args.rows, args.pending_every, args.chunk_size, args.reader_timeout)
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    chunked = results[-1]
+    # The chunked batch must finish without a single lock error on either side
+    sys.exit(1 if chunked['reader_lock_errors'] or chunked['writer_error'] else 0)
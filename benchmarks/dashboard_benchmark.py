@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, '..'))
+APP_PATH = os.path.join(ROOT_DIR, 'dashboard', 'app.py')
+
+PAGES = ["Overview", "Data Analysis (EDA)", "AI Predictions", "AI Code Assistant (GenAI)"]
+
+def measure_once(start_page):
+    """Script run times of one fresh dashboard process: first paint on `start_page`, then each page cold and warm.
+
+    Runs the app headless with streamlit's AppTest, in this process, so it
+    must be called in a new interpreter for the first paint to be cold.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=300)
+    # Opened directly on `start_page` (the sidebar radio's session key); later pages are switched through the sidebar
+    app.session_state['page'] = start_page
+    start = time.perf_counter()
+    app.run()
+    result = {'first_paint_s': round(time.perf_counter() - start, 4), 'pages': {}}
+    if app.exception:
+        raise RuntimeError(f"Dashboard raised: {app.exception[0].value}")
+    # Heavy libraries the first page pulled in
+    result['first_paint_modules'] = sorted(name for name in ('matplotlib', 'seaborn', 'sklearn', 'pyarrow.dataset', 'joblib')
+                                          if name in sys.modules)
+
+    for page in PAGES:
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            app.sidebar.radio[0].set_value(page).run()
+            timings.append(round(time.perf_counter() - start, 4))
+        result['pages'][page] = {'first_s': timings[0], 'rerun_s': timings[1]}
+    return result
+
+def run_benchmark(repeat=3, start_page=PAGES[0]):
+    """Median over `repeat` fresh processes (each one a cold start)."""
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', '--start-page', start_page],
+            capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONWARNINGS='ignore')
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    pages = {
+        page: {key: round(statistics.median(run['pages'][page][key] for run in runs), 4) for key in ('first_s', 'rerun_s')}
+        for page in PAGES
+    }
+    return {
+        'start_page': start_page,
+        'repeat': repeat,
+        'first_paint_s': round(statistics.median(run['first_paint_s'] for run in runs), 4),
+        'first_paint_modules': runs[0]['first_paint_modules'],
+        'pages': pages,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard cold start (first paint) and per-page script run times.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes to measure (median is reported).")
+    parser.add_argument("--start-page", choices=PAGES, default=PAGES[0], help="Page opened first.")
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_once(args.start_page)))
+        sys.exit(0)
+
+    results = run_benchmark(args.repeat, args.start_page)
+    print(f"First paint ({results['start_page']}): {results['first_paint_s']:.3f}s, "
+          f"heavy modules loaded: {', '.join(results['first_paint_modules']) or 'none'}")
+    for page, timing in results['pages'].items():
+        print(f"  {page:<28} first {timing['first_s']:.3f}s  rerun {timing['rerun_s']:.3f}s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.linear_model import LogisticRegression
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, '..'))
+
+from analytics.features import (
+    RISK_FEATURES, SEGMENT_FEATURES, TARGET, FeatureBuffer, to_datetime64, add_features, unnamed_features
+)
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_BATCH_SIZES = [1, 8, 64, 256]
+
+def synthetic_extract(rows, seed=42):
+    """Date and amount columns shaped like the ETL extract (dates as 'YYYY-MM-DD HH:MM:SS' strings)."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2023-01-01T00:00:00', 's')
+    tx_dates = start + rng.integers(0, 3 * 365 * 86400, rows).astype('timedelta64[s]')
+    # Few distinct account dates, as when customers are joined onto their transactions
+    created = np.datetime64('2020-01-01', 'D') + rng.integers(0, 1000, rows // 50 + 1).astype('timedelta64[D]')
+    return pd.DataFrame({
+        'amount': rng.exponential(200, rows).round(2),
+        'transaction_date': np.char.replace(np.datetime_as_string(tx_dates), 'T', ' ').astype(object),
+        'account_created_date': np.datetime_as_string(created[rng.integers(0, len(created), rows)]).astype(object),
+    })
+
+def pandas_features(df):
+    # Previous transform_data implementation, kept as the baseline
+    df['transaction_date'] = pd.to_datetime(df['transaction_date'])
+    df['account_created_date'] = pd.to_datetime(df['account_created_date'])
+    df['tx_hour'] = df['transaction_date'].dt.hour
+    df['tx_day_of_week'] = df['transaction_date'].dt.dayofweek
+    df['account_age_days'] = (df['transaction_date'] - df['account_created_date']).dt.days
+    df[TARGET] = (df['amount'] > 500).astype(int)
+    return df
+
+def columnar_features(df):
+    df['transaction_date'] = to_datetime64(df['transaction_date'])
+    df['account_created_date'] = to_datetime64(df['account_created_date'], repeated=True)
+    return add_features(df)
+
+def seconds_per_call(fn, repeat=5):
+    """Best of `repeat` timings, each running `fn` for at least 0.2s."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def bench_columnar(rows, seed=42):
+    raw = synthetic_extract(rows, seed)
+    results = {}
+    for name, fn in (('pandas', pandas_features), ('columnar', columnar_features)):
+        # Each run gets a fresh copy; the copy itself is timed separately and subtracted
+        seconds = seconds_per_call(lambda: fn(raw.copy()), repeat=3) - seconds_per_call(raw.copy, repeat=3)
+        results[name] = {'wall_s': round(seconds, 4), 'ns_per_row': round(seconds / rows * 1e9, 1)}
+
+    expected, actual = pandas_features(raw.copy()), columnar_features(raw.copy())
+    for column in ['tx_hour', 'tx_day_of_week', 'account_age_days', TARGET]:
+        if not np.array_equal(expected[column].to_numpy(), actual[column].to_numpy()):
+            raise AssertionError(f"Columnar path differs from pandas on {column}")
+    return results
+
+def fit_models(seed=42):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'tx_hour': rng.integers(0, 24, 5000),
+        'tx_day_of_week': rng.integers(0, 7, 5000),
+        'account_age_days': rng.integers(0, 2000, 5000),
+        'amount': rng.exponential(200, 5000),
+    })
+    lr = LogisticRegression().fit(X[RISK_FEATURES], X['amount'] > 500)
+    kmeans = KMeans(n_clusters=3, random_state=seed, n_init=1).fit(X[SEGMENT_FEATURES])
+    return lr, kmeans
+
+def bench_serving(batch_sizes, seed=42):
+    """Per-row cost of building model inputs, alone and with the model call, before and after."""
+    lr, kmeans = fit_models(seed)
+    rng = np.random.default_rng(seed)
+    risk_input = FeatureBuffer(RISK_FEATURES, capacity=max(batch_sizes))
+    segment_input = FeatureBuffer(SEGMENT_FEATURES, capacity=max(batch_sizes))
+    results = []
+    for n in batch_sizes:
+        risk_rows = [(int(rng.integers(24)), int(rng.integers(7)), int(rng.integers(2000))) for _ in range(n)]
+        segment_rows = [(float(rng.uniform(1, 1000)), hour) for hour, _, _ in risk_rows]
+        cases = {
+            'dataframe': (lambda: pd.DataFrame(risk_rows, columns=RISK_FEATURES),
+                          lambda: pd.DataFrame(segment_rows, columns=SEGMENT_FEATURES)),
+            'buffer': (lambda: risk_input.fill(risk_rows), lambda: segment_input.fill(segment_rows)),
+        }
+        for name, (risk_x, segment_x) in cases.items():
+            build = seconds_per_call(risk_x)
+            # Scoped as the API scopes it, so both cases pay the same for warnings
+            with unnamed_features(lr):
+                risk = seconds_per_call(lambda: lr.predict_proba(risk_x()))
+            with unnamed_features(kmeans):
+                segment = seconds_per_call(lambda: kmeans.predict(segment_x()))
+            results.append({
+                'batch_size': n,
+                'inputs': name,
+                'build_us_per_row': round(build / n * 1e6, 2),
+                'risk_us_per_row': round(risk / n * 1e6, 2),
+                'segment_us_per_row': round(segment / n * 1e6, 2),
+            })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-row cost of feature engineering in the ETL and serving paths.")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Rows for the columnar (ETL) benchmark.")
+    parser.add_argument("--batch-sizes", type=int, nargs='+', default=DEFAULT_BATCH_SIZES,
+                        help="Rows per model call for the serving benchmark.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    print(f"Columnar transform on {args.rows:,} rows...")
+    columnar = bench_columnar(args.rows, args.seed)
+    for name, result in columnar.items():
+        print(f"  {name:<9} {result['wall_s']:.3f}s  {result['ns_per_row']:.0f} ns/row")
+
+    print("Serving inputs (microseconds per row):")
+    serving = bench_serving(args.batch_sizes, args.seed)
+    print(pd.DataFrame(serving).to_string(index=False))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'columnar': columnar, 'serving': serving}, f, indent=2)
+        print(f"Results saved to {args.output}")
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, '..'))
+
+from analytics.features import MODEL_FEATURES
+from ml_core.compiled import compile_model, check_parity
+from ml_core.registry import ModelRegistry
+
+DEFAULT_BATCH_SIZES = [1, 8, 64, 256, 10_000]
+PARITY_ROWS = 100_000
+
+def random_inputs(rows, seed=42):
+    """Feature rows covering the ranges seen in the legacy data, plus out-of-range values."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'tx_hour': rng.integers(0, 24, rows),
+        'tx_day_of_week': rng.integers(0, 7, rows),
+        'account_age_days': rng.integers(-30, 4000, rows),
+        'amount': rng.exponential(200, rows).round(2),
+    })
+
+def seconds_per_call(fn, repeat=5):
+    """Best of `repeat` timings, each running `fn` for at least 0.2s."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def score_fn(model):
+    return model.predict_proba if hasattr(model, 'predict_proba') else model.predict
+
+def run_benchmark(model_dir=None, batch_sizes=DEFAULT_BATCH_SIZES, seed=42):
+    models = ModelRegistry(model_dir)
+    if not models.available():
+        raise SystemExit("Models not found. Please run train_models.py first.")
+
+    inputs = random_inputs(max(PARITY_ROWS, max(batch_sizes)), seed)
+    results = {'version': models.version, 'parity': {}, 'latency': []}
+    for name, features in MODEL_FEATURES.items():
+        model = models.get(name)
+        # Single-threaded, like one API inference thread
+        if hasattr(model, 'n_jobs'):
+            model.n_jobs = 1
+        # Versions published before the export step are compiled on the fly
+        compiled = models.get_compiled(name) or compile_model(model, features)
+
+        # 1. Parity: identical predictions, probabilities within PARITY_TOLERANCE
+        check_parity(model, compiled, inputs[features].head(PARITY_ROWS))
+        results['parity'][name] = 'ok'
+        print(f"{name}: compiled engine matches sklearn on {PARITY_ROWS:,} rows")
+
+        # 2. Latency, with the plain float arrays the API passes in
+        X = inputs[features].to_numpy(dtype=float)
+        for n in batch_sizes:
+            batch = X[:n]
+            sklearn_s = seconds_per_call(lambda: score_fn(model)(batch), repeat=3)
+            compiled_s = seconds_per_call(lambda: score_fn(compiled)(batch), repeat=3)
+            results['latency'].append({
+                'model': name,
+                'batch_size': n,
+                'sklearn_us': round(sklearn_s * 1e6, 1),
+                'compiled_us': round(compiled_s * 1e6, 1),
+                'speedup': round(sklearn_s / compiled_s, 1),
+            })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check compiled models against sklearn and compare their latency.")
+    parser.add_argument("--model-dir", default=None, help="Model registry directory (default: ml_core/models)")
+    parser.add_argument("--batch-sizes", type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    try:
+        results = run_benchmark(args.model_dir, args.batch_sizes, args.seed)
+    except AssertionError as e:
+        print(f"Parity check failed: {e}")
+        sys.exit(1)
+
+    print(f"\nLatency per call (model version {results['version']}):")
+    print(pd.DataFrame(results['latency']).to_string(index=False))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import statistics
+import tempfile
+import time
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, '..'))
+sys.path.append(ROOT_DIR)
+RESULTS_DIR = os.path.join(BASE_DIR, 'results')
+
+from api_layer.load_test import run_load_test
+
+DEFAULT_SIZES = [10_000, 1_000_000]
+# Above this many rows the full in-memory trainer is swapped for the streaming one
+INCREMENTAL_TRAIN_ROWS = 2_000_000
+ETL_CHUNK_SIZE = 500_000
+
+# Metrics where a larger value is a regression; for the others (rows/sec, rps) a smaller one is
+HIGHER_IS_WORSE = {'wall_s', 'peak_rss_mb', 'p50_ms', 'p95_ms', 'p99_ms', 'import_s', 'load_s', 'first_predict_ms'}
+LOWER_IS_WORSE = {'rows_per_s', 'rps'}
+
+def stage_env(work_dir):
+    """Points every script at `work_dir`, so committed databases and models are never touched."""
+    env = dict(os.environ)
+    env.update({
+        'LEGACY_DB_PATH': os.path.join(work_dir, 'legacy_system.db'),
+        'FEATURE_STORE_PATH': os.path.join(work_dir, 'feature_store'),
+        'ETL_STATE_PATH': os.path.join(work_dir, 'etl_state.json'),
+        'ROLLUP_PATH': os.path.join(work_dir, 'rollups'),
+        'MODEL_DIR': os.path.join(work_dir, 'models'),
+        'RUN_SUMMARY_DIR': os.path.join(work_dir, 'runs'),
+        'PYTHONWARNINGS': 'ignore',
+    })
+    return env
+
+def run_stage(name, args, env, log_dir):
+    """Runs one stage in a fresh Python process; returns its wall time, peak RSS and stdout."""
+    log_path = os.path.join(log_dir, f"{name}.log")
+    print(f"  {name}: {' '.join(args)}")
+    with open(log_path, 'w') as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable] + args, cwd=ROOT_DIR, env=env, stdout=subprocess.PIPE,
+                                stderr=log, text=True)
+        stdout = proc.stdout.read()
+        peak_mb = None
+        if hasattr(os, 'wait4'):
+            # Resource usage of this child only (ru_maxrss is in kilobytes on Linux)
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            peak_mb = usage.ru_maxrss / 1024
+        else:
+            proc.wait()
+        wall = time.perf_counter() - start
+        log.write(stdout)
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"Stage {name} failed with exit code {proc.returncode}; see {log_path}")
+    return {'wall_s': round(wall, 3), 'peak_rss_mb': round(peak_mb, 1) if peak_mb else None}, stdout
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API at {url} did not start within {timeout}s")
+
+def serve_stage(env, log_dir, workers, concurrency, duration):
+    """Starts the API with serve.py and drives both single-row endpoints with concurrent clients."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    # Unique feature tuples per request, so the numbers measure inference rather than the cache
+    env = dict(env, PREDICTION_CACHE_SIZE='0', MODEL_POLL_SECONDS='0')
+    with open(os.path.join(log_dir, 'serve.log'), 'w') as log:
+        server = subprocess.Popen([sys.executable, 'api_layer/serve.py', '--host', '127.0.0.1',
+                                   '--port', str(port), '--workers', str(workers)],
+                                  cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            start = time.perf_counter()
+            wait_until_ready(url)
+            results = {'startup_s': round(time.perf_counter() - start, 3), 'workers': workers}
+            for endpoint in ('/predict/risk', '/predict/segment'):
+                print(f"  serve: {concurrency} clients on {endpoint} for {duration:.0f}s")
+                stats = run_load_test(url, endpoint, concurrency, duration)
+                results[endpoint] = {key: (round(value, 3) if isinstance(value, float) else value)
+                                     for key, value in stats.items() if key != 'endpoint'}
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return results
+
+def measure_model_load():
+    """Internal stage (run in its own process): cold import of the API module and model load.
+
+    Loads what the API serves with: the compiled engines when the version has
+    them, else the sklearn models.
+    """
+    start = time.perf_counter()
+    sys.path.append(os.path.join(ROOT_DIR, 'api_layer'))
+    import main
+    imported = time.perf_counter()
+    models = main.registry
+    lr_model, kmeans_model = models.predictor('lr'), models.predictor('kmeans')
+    loaded = time.perf_counter()
+    main.score_risk_rows(lr_model, [[12, 3, 365]])
+    main.score_segment_rows(kmeans_model, [[150.0, 12]])
+    predicted = time.perf_counter()
+    return {
+        'version': models.version,
+        'compiled': models.get_compiled('lr') is not None and models.get_compiled('kmeans') is not None,
+        'import_s': round(imported - start, 3),
+        'load_s': round(loaded - imported, 3),
+        'first_predict_ms': round((predicted - loaded) * 1000, 3)
+    }
+
+def bench_size(rows, args):
+    work_dir = tempfile.mkdtemp(prefix=f"bench-{rows}-", dir=args.work_dir)
+    env = stage_env(work_dir)
+    customers = max(rows // 10, 100)
+    results = {}
+    print(f"Benchmarking {rows:,} rows in {work_dir}")
+    try:
+        # 1. Seed
+        stats, _ = run_stage('seed', ['database/seed_data.py', '--db', env['LEGACY_DB_PATH'], '--bulk',
+                                      '--customers', str(customers), '--transactions', str(rows),
+                                      '--seed', str(args.seed)], env, work_dir)
+        results['seed'] = dict(stats, rows_per_s=round(rows / stats['wall_s'], 1))
+        run_stage('migrate', ['database/migrate.py', '--db', env['LEGACY_DB_PATH']], env, work_dir)
+
+        # 2. ETL: extract_data -> transform_data -> load_data (streamed above one chunk)
+        etl_args = ['analytics/etl_process.py', '--full-refresh']
+        if rows > ETL_CHUNK_SIZE:
+            etl_args += ['--chunk-size', str(ETL_CHUNK_SIZE)]
+        stats, _ = run_stage('etl', etl_args, env, work_dir)
+        results['etl'] = dict(stats, rows_per_s=round(rows / stats['wall_s'], 1))
+
+        # 3. Training
+        train_args = ['ml_core/train_models.py']
+        if rows > INCREMENTAL_TRAIN_ROWS:
+            train_args.append('--incremental')
+        stats, _ = run_stage('train', train_args, env, work_dir)
+        results['train'] = dict(stats, rows_per_s=round(rows / stats['wall_s'], 1),
+                                mode='incremental' if '--incremental' in train_args else 'full')
+
+        # 4. Model load, as done by api_layer/main.py
+        stats, stdout = run_stage('model_load', [os.path.relpath(__file__, ROOT_DIR), '--stage', 'model-load'],
+                                  env, work_dir)
+        results['model_load'] = dict(stats, **json.loads(stdout.strip().splitlines()[-1]))
+
+        # 5. Serving
+        if not args.skip_serve:
+            results['serve'] = serve_stage(env, work_dir, args.workers, args.concurrency, args.duration)
+    finally:
+        if args.keep:
+            print(f"  kept {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def median_results(runs):
+    """Per-metric median of several runs of the same size (non-numeric values come from the first run)."""
+    first = runs[0]
+    if isinstance(first, dict):
+        return {key: median_results([run[key] for run in runs]) for key in first}
+    if isinstance(first, (int, float)) and not isinstance(first, bool) and None not in runs:
+        return round(statistics.median(runs), 3)
+    return first
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def run_benchmarks(args):
+    report = {
+        'commit': git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': args.repeat,
+        'sizes': {}
+    }
+    for rows in args.sizes:
+        report['sizes'][str(rows)] = median_results([bench_size(rows, args) for _ in range(args.repeat)])
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json")
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {out_path}")
+    return out_path
+
+def flatten(stage):
+    """{'wall_s': 1, '/predict/risk': {'rps': 2}} -> {'wall_s': 1, '/predict/risk.rps': 2}"""
+    flat = {}
+    for key, value in stage.items():
+        if isinstance(value, dict):
+            flat.update({f"{key}.{k}": v for k, v in flatten(value).items()})
+        else:
+            flat[key] = value
+    return flat
+
+def compare(base_path, new_path, threshold=0.10):
+    """Prints metric changes between two result files; returns the number of regressions beyond `threshold`."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"Comparing {base['commit']} ({base['created_at']}) -> {new['commit']} ({new['created_at']})")
+
+    regressions = 0
+    for size, stages in new['sizes'].items():
+        for stage, metrics in stages.items():
+            old_metrics = flatten(base['sizes'].get(size, {}).get(stage, {}))
+            for key, value in flatten(metrics).items():
+                old = old_metrics.get(key)
+                metric = key.rsplit('.', 1)[-1]
+                if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                    continue
+                if metric not in HIGHER_IS_WORSE and metric not in LOWER_IS_WORSE:
+                    continue
+                change = (value - old) / old
+                worse = change > threshold if metric in HIGHER_IS_WORSE else change < -threshold
+                regressions += worse
+                flag = "REGRESSION" if worse else ""
+                print(f"{size:>10} {stage:<12}{key:<28}{old:>12.2f} -> {value:>12.2f} {change:+8.1%} {flag}")
+
+    print(f"{regressions} regressions beyond {threshold:.0%}.")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark seed -> ETL -> train -> model load -> serve.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Transaction counts to benchmark, e.g. 10000 1000000 10000000.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per size; the median of each metric is kept.")
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes for the serve stage.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients for the serve stage.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per endpoint in the serve stage.")
+    parser.add_argument("--skip-serve", action="store_true")
+    parser.add_argument("--work-dir", default=None, help="Where scratch databases and models are created (default: system temp).")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directories.")
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=('BASE', 'NEW'),
+                        help="Compare two result files instead of running; exits 1 on regressions.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression.")
+    parser.add_argument("--stage", choices=['model-load'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage == 'model-load':
+        print(json.dumps(measure_model_load()))
+    elif args.compare:
+        sys.exit(1 if compare(*args.compare, threshold=args.threshold) else 0)
+    else:
+        run_benchmarks(args)
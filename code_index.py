@@ -0,0 +1,306 @@
+# code_index.py
+# Persistent, incremental index of Python source metrics for the GenAI code assistant.
+# Files are parsed with `ast` once per distinct content; later scans only re-parse what changed.
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.getenv("CODE_INDEX_PATH", os.path.join(BASE_DIR, 'code_index.db'))
+
+# Stored as PRAGMA user_version; bump it when a metric's definition changes so existing indexes are rebuilt
+INDEX_VERSION = 1
+# Directories never descended into
+SKIP_DIRS = {'.git', '__pycache__', 'node_modules', 'venv', '.venv', '.tox', '.nox', 'site-packages'}
+# Below this many changed files parsing runs inline; starting a process pool would cost more
+PARALLEL_MIN_FILES = 64
+WRITE_BATCH_FILES = 1_000
+
+# Decision points counted for McCabe cyclomatic complexity; boolean operators add one per extra operand.
+# ast.match_case only exists on Python 3.10+ (the containers run 3.9, which cannot parse `match` anyway)
+BRANCH_NODES = (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.Assert,
+                getattr(ast, 'match_case', ()))
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+# parse_error prefix of files that could not be read; they are retried on the next scan
+READ_ERROR = 'OSError'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (root, path)
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    content_hash TEXT PRIMARY KEY,
+    loc INTEGER NOT NULL,
+    sloc INTEGER NOT NULL,
+    functions INTEGER,
+    classes INTEGER,
+    complexity INTEGER,
+    max_complexity INTEGER,
+    imports TEXT,
+    parse_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_hash ON files (content_hash);
+"""
+
+def connect(db_path=None):
+    conn = sqlite3.connect(db_path or INDEX_PATH, timeout=30)
+    # Readers (the dashboard) are not blocked while a scan writes
+    conn.execute("PRAGMA journal_mode = WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS metrics;")
+        conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _connect_read_only(db_path=None):
+    # mode=ro: reading never creates, migrates or drops anything, even when the version is stale
+    path = pathlib.Path(db_path or INDEX_PATH).resolve()
+    return sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True, timeout=30)
+
+def iter_python_files(root):
+    """Yields (relative path, os.stat_result) for every .py file under root, skipping SKIP_DIRS and hidden directories."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.'))
+        for name in sorted(filenames):
+            if name.endswith('.py'):
+                path = os.path.join(dirpath, name)
+                try:
+                    yield os.path.relpath(path, root), os.stat(path)
+                except OSError:
+                    continue
+
+def _scope_nodes(scope):
+    # Nodes belonging to this function (or the module), not to functions nested in it
+    stack = list(ast.iter_child_nodes(scope))
+    while stack:
+        node = stack.pop()
+        yield node
+        if not isinstance(node, FUNCTION_NODES):
+            stack.extend(ast.iter_child_nodes(node))
+
+def cyclomatic_complexity(scope):
+    complexity = 1
+    for node in _scope_nodes(scope):
+        if isinstance(node, BRANCH_NODES):
+            complexity += 1
+        elif isinstance(node, ast.BoolOp):
+            complexity += len(node.values) - 1
+        elif isinstance(node, ast.comprehension):
+            complexity += 1 + len(node.ifs)
+    return complexity
+
+def analyze_source(source):
+    """Metrics of one file's source (bytes or str).
+
+    `complexity` sums the cyclomatic complexity of the module body and of
+    every function and method; `max_complexity` is the highest single one.
+    Files that do not parse (e.g. Python 2) keep their line counts and the error.
+    """
+    lines = source.splitlines()
+    comment = b'#' if isinstance(source, bytes) else '#'
+    result = {
+        'loc': len(lines),
+        'sloc': sum(1 for line in lines if line.strip() and not line.lstrip().startswith(comment)),
+        'functions': None, 'classes': None, 'complexity': None, 'max_complexity': None,
+        'imports': None, 'parse_error': None,
+    }
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError) as e:
+        result['parse_error'] = f"{type(e).__name__}: {e}"
+        return result
+
+    # 1. Definitions and imports
+    functions, classes, imports = [], 0, set()
+    for node in ast.walk(tree):
+        if isinstance(node, FUNCTION_NODES):
+            functions.append(node)
+        elif isinstance(node, ast.ClassDef):
+            classes += 1
+        elif isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.add('.' * node.level + (node.module or ''))
+
+    # 2. Cyclomatic complexity per scope
+    complexities = [cyclomatic_complexity(scope) for scope in [tree] + functions]
+    result.update({
+        'functions': len(functions),
+        'classes': classes,
+        'complexity': sum(complexities),
+        'max_complexity': max(complexities),
+        'imports': json.dumps(sorted(imports)),
+    })
+    return result
+
+def parse_file(task):
+    """Pool worker: (path, content hash, metrics) of one (path, content hash) to parse.
+
+    A file deleted or made unreadable since it was hashed is recorded with the
+    error under the hash it had, like one that does not parse.
+    """
+    path, content_hash = task
+    try:
+        with open(path, 'rb') as f:
+            source = f.read()
+    except OSError as e:
+        metrics = dict.fromkeys(('functions', 'classes', 'complexity', 'max_complexity', 'imports'))
+        return path, content_hash, dict(metrics, loc=0, sloc=0, parse_error=f"{READ_ERROR}: {e}")
+    return path, hashlib.sha256(source).hexdigest(), analyze_source(source)
+
+def _write_metrics(conn, parsed):
+    conn.executemany(
+        "INSERT OR REPLACE INTO metrics (content_hash, loc, sloc, functions, classes, complexity, max_complexity, "
+        "imports, parse_error) VALUES (:content_hash, :loc, :sloc, :functions, :classes, :complexity, "
+        ":max_complexity, :imports, :parse_error)",
+        [dict(metrics, content_hash=content_hash) for content_hash, metrics in parsed]
+    )
+
+def update_index(root, db_path=None, workers=None):
+    """Brings the index of `root` up to date and returns counts of what was done.
+
+    1. Files whose size and mtime are unchanged since the last scan are not opened.
+    2. Other files are hashed; content already in the index (a touched,
+       copied or renamed file) is not parsed again.
+    3. The remaining files are parsed in a process pool.
+    4. Files that no longer exist are dropped, with metrics nothing refers to.
+    """
+    root = os.path.realpath(root)
+    start = time.perf_counter()
+    conn = connect(db_path)
+    known = {path: (size, mtime_ns, content_hash) for path, size, mtime_ns, content_hash in
+             conn.execute("SELECT path, size, mtime_ns, content_hash FROM files WHERE root = ?", (root,))}
+    # Content that could not be read last time is parsed again
+    known_hashes = {row[0] for row in conn.execute(
+        "SELECT content_hash FROM metrics WHERE parse_error IS NULL OR parse_error NOT LIKE ?", (READ_ERROR + '%',))}
+
+    # 1. Stat every file and hash only those that look changed
+    seen, changed, to_parse = set(), [], []
+    for path, stat in iter_python_files(root):
+        seen.add(path)
+        previous = known.get(path)
+        if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+            continue
+        try:
+            with open(os.path.join(root, path), 'rb') as f:
+                content_hash = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            continue
+        changed.append((root, path, stat.st_size, stat.st_mtime_ns, content_hash))
+        if content_hash not in known_hashes:
+            known_hashes.add(content_hash)
+            to_parse.append((os.path.join(root, path), content_hash))
+
+    # 2. Parse new content, in parallel when there is enough of it
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(to_parse) >= PARALLEL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(parse_file, to_parse, chunksize=max(1, len(to_parse) // (workers * 8)))
+            parsed, unreadable = _store(conn, results)
+    else:
+        parsed, unreadable = _store(conn, map(parse_file, to_parse))
+
+    # 3. Record file states; forget deleted files and unreferenced metrics.
+    #    Unreadable files get a size no stat matches, so the next scan opens them again.
+    changed = [(root, path, -1 if os.path.join(root, path) in unreadable else size, mtime_ns, content_hash)
+               for root, path, size, mtime_ns, content_hash in changed]
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO files (root, path, size, mtime_ns, content_hash) "
+                         "VALUES (?, ?, ?, ?, ?)", changed)
+        removed = [(root, path) for path in known.keys() - seen]
+        conn.executemany("DELETE FROM files WHERE root = ? AND path = ?", removed)
+        if removed or changed:
+            conn.execute("DELETE FROM metrics WHERE content_hash NOT IN (SELECT content_hash FROM files)")
+    conn.close()
+
+    return {'files': len(seen), 'changed': len(changed), 'parsed': parsed, 'removed': len(removed),
+            'seconds': round(time.perf_counter() - start, 3)}
+
+def _store(conn, results):
+    # Written as results arrive, in batches, so memory stays flat on large trees
+    batch, parsed, unreadable = [], 0, set()
+    for path, content_hash, metrics in results:
+        batch.append((content_hash, metrics))
+        if (metrics['parse_error'] or '').startswith(READ_ERROR):
+            unreadable.add(path)
+        if len(batch) >= WRITE_BATCH_FILES:
+            with conn:
+                _write_metrics(conn, batch)
+            parsed += len(batch)
+            batch = []
+    with conn:
+        _write_metrics(conn, batch)
+    return parsed + len(batch), unreadable
+
+def load_index(root, db_path=None):
+    """Indexed metrics for every file under `root` (as last scanned), as a list of dicts.
+
+    Empty when there is no index yet or it was built by another INDEX_VERSION;
+    the next update_index rebuilds it.
+    """
+    root = os.path.realpath(root)
+    if not os.path.exists(db_path or INDEX_PATH):
+        return []
+    conn = _connect_read_only(db_path)
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            return []
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            "SELECT f.path, m.loc, m.sloc, m.functions, m.classes, m.complexity, m.max_complexity, m.imports, "
+            "m.parse_error FROM files f JOIN metrics m ON m.content_hash = f.content_hash "
+            "WHERE f.root = ? ORDER BY f.path", (root,)
+        ).fetchall()
+    finally:
+        conn.close()
+    records = []
+    for row in rows:
+        record = dict(row)
+        record['imports'] = json.loads(record['imports']) if record['imports'] else []
+        records.append(record)
+    return records
+
+def risk_level(record):
+    # McCabe's usual thresholds for the most complex function in the file
+    if record['parse_error']:
+        return 'Unknown'
+    if record['max_complexity'] > 20:
+        return 'High'
+    if record['max_complexity'] > 10:
+        return 'Medium'
+    return 'Low'
+
+def recommendation(record):
+    """Modernization suggestion derived from a file's metrics."""
+    if record['parse_error']:
+        return "Does not parse with the current Python version; port it (e.g. from Python 2) before refactoring."
+    if record['max_complexity'] > 20:
+        return f"Split its most complex function (complexity {record['max_complexity']}) into smaller, testable units."
+    if record['max_complexity'] > 10:
+        return "Add unit tests around its branching logic before changing it."
+    if record['functions'] == 0 and record['sloc'] > 50:
+        return "Script-style module; wrap the top-level logic in functions so it can be imported and tested."
+    return "Low complexity; a good candidate for containerization as is."
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or incrementally update the code index of a source tree.")
+    parser.add_argument("root", nargs='?', default=BASE_DIR, help="Directory to index (default: this repository).")
+    parser.add_argument("--db", default=None, help="Index file (default: code_index.db or $CODE_INDEX_PATH).")
+    parser.add_argument("--workers", type=int, default=None, help="Parsing processes (default: CPU count).")
+    args = parser.parse_args()
+
+    stats = update_index(args.root, args.db, args.workers)
+    print(f"Indexed {stats['files']} files in {stats['seconds']}s: {stats['changed']} new or changed, "
+          f"{stats['parsed']} parsed, {stats['removed']} removed.")
@@ -1,41 +1,114 @@
+import time
+# Start of this script run; on a cold start it includes the imports below
+RUN_STARTED = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 import requests
-import matplotlib.pyplot as plt
-import seaborn as sns
 
+import io
 import os
-
-# Config
-st.set_page_config(page_title="Modernization Analytics Dashboard", layout="wide")
-import pickle
+import sys
+import threading
 
 # Config
 st.set_page_config(page_title="Modernization Analytics Dashboard", layout="wide")
 # Check for environment variable if running in Docker, else default to localhost
 API_URL = os.getenv("API_URL", "http://localhost:8000")
+# (connect, read) seconds for prediction calls; the health check uses the connect timeout for both
+API_TIMEOUT = (0.5, 5.0)
+# Reruns read the last known API status; it is re-checked in the background once older than this
+HEALTH_TTL_SECONDS = float(os.getenv("HEALTH_TTL_SECONDS", "10"))
 
 # Use relative paths for better portability
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_PATH = os.path.join(BASE_DIR, '..', 'analytics', 'cleaned_data.csv')
+sys.path.append(os.path.join(BASE_DIR, '..'))
 MODEL_DIR = os.path.join(BASE_DIR, '..', 'ml_core', 'models')
 
+# The feature store and rollups (pyarrow) and the model registry (joblib) are
+# imported by the functions and pages that use them, not on every first paint
+from analytics.features import RISK_FEATURES, SEGMENT_FEATURES, FeatureBuffer, unnamed_features
+from monitoring import metrics
+
+# Loads are timed inside the cached functions, so only real (uncached) loads are recorded
+LOAD_SECONDS = metrics.histogram('dashboard_load_seconds', 'Uncached data loads.', ['source'])
+RENDER_SECONDS = metrics.histogram('dashboard_render_seconds', 'Chart rendering time.', ['chart'])
+SCRIPT_SECONDS = metrics.histogram('dashboard_script_seconds', 'Full script runs (page loads and reruns).', ['page'])
+FIRST_PAINT_SECONDS = metrics.histogram('dashboard_first_paint_seconds', 'First script run after process start.')
+
+# Codebase scanned by the GenAI assistant (this project by default)
+CODE_ROOT = os.getenv("CODE_ROOT", os.path.join(BASE_DIR, '..'))
+# Most complex modules shown with generated insights; every module is listed in the table
+INSIGHT_MODULES = 20
+
+# Uploads are parsed in chunks of this many rows and only their summaries are kept
+UPLOAD_CHUNK_ROWS = 200_000
+PREVIEW_SAMPLE_ROWS = 1_000
+# Same cut-off as the API's RISK_THRESHOLD (and LogisticRegression.predict)
+RISK_THRESHOLD = 0.5
+
 # --- LOCAL MODEL LOADING (for standalone/cloud mode) ---
 @st.cache_resource
 def load_local_models():
-    models = {}
-    try:
-        with open(os.path.join(MODEL_DIR, 'logistic_regression.pkl'), 'rb') as f:
-            models['lr'] = pickle.load(f)
-        with open(os.path.join(MODEL_DIR, 'random_forest.pkl'), 'rb') as f:
-            models['rf'] = pickle.load(f)
-        with open(os.path.join(MODEL_DIR, 'kmeans.pkl'), 'rb') as f:
-            models['kmeans'] = pickle.load(f)
-        return models
-    except Exception as e:
+    # Models are memory-mapped and only loaded when a prediction first needs them
+    from ml_core.registry import ModelRegistry
+    registry = ModelRegistry(MODEL_DIR)
+    if not registry.available():
         return None
+    return registry
+
+# --- API CLIENT ---
+@st.cache_resource
+def api_session():
+    # One keep-alive connection pool per dashboard process instead of a new connection per call
+    return requests.Session()
+
+class ApiHealth:
+    """Last known API status, shared by every session and rerun.
+
+    Only the very first check blocks (for at most the connect timeout); once
+    the status is older than `ttl` it is refreshed in a background thread
+    while reruns keep reading the previous value.
+    """
 
-local_models = load_local_models()
+    def __init__(self, session, url, ttl=HEALTH_TTL_SECONDS):
+        self.session = session
+        self.url = url
+        self.ttl = ttl
+        self.online = None
+        self.checked_at = 0.0
+        self._refreshing = threading.Lock()
+
+    def mark(self, online):
+        self.online = online
+        self.checked_at = time.monotonic()
+
+    def check(self):
+        try:
+            online = self.session.get(f"{self.url}/", timeout=API_TIMEOUT[0]).status_code == 200
+        except requests.RequestException:
+            online = False
+        self.mark(online)
+
+    def _refresh(self):
+        try:
+            self.check()
+        finally:
+            self._refreshing.release()
+
+    def status(self):
+        if self.online is None:
+            self.check()
+        elif time.monotonic() - self.checked_at > self.ttl and self._refreshing.acquire(blocking=False):
+            threading.Thread(target=self._refresh, name="api-health", daemon=True).start()
+        return self.online
+
+@st.cache_resource
+def api_health():
+    return ApiHealth(api_session(), API_URL)
+# Inputs for local inference, built the same way as in the API
+risk_input = FeatureBuffer(RISK_FEATURES, capacity=1)
+segment_input = FeatureBuffer(SEGMENT_FEATURES, capacity=1)
 
 # Title
 st.title("Cloud-Enabled Intelligent Modernization Dashboard")
@@ -43,7 +116,8 @@ st.markdown("### Transaction Analytics & AI Outcomes")
 
 # Sidebar
 st.sidebar.header("Navigation")
-page = st.sidebar.radio("Go to", ["Overview", "Data Analysis (EDA)", "AI Predictions", "AI Code Assistant (GenAI)"])
+page = st.sidebar.radio("Go to", ["Overview", "Data Analysis (EDA)", "AI Predictions", "AI Code Assistant (GenAI)"],
+                        key='page')
 
 # File Uploader
 st.sidebar.markdown("---")
@@ -51,17 +125,12 @@ st.sidebar.subheader("Upload Data")
 uploaded_file = st.sidebar.file_uploader("Upload CSV for Analysis", type=["csv"])
 
 # System Status Check (IBM Style)
-api_online = False
-try:
-    # Short timeout to avoid blocking UI
-    if requests.get(f"{API_URL}/", timeout=0.5).status_code == 200:
-        api_online = True
-except:
-    api_online = False
+# Cached status, so a stopped API does not slow down every interaction
+api_online = api_health().status()
 
 if api_online:
     st.sidebar.success("✅ System Status: Online (API)")
-elif local_models:
+elif load_local_models():
     st.sidebar.success("✅ System Status: Online (Native Engine)")
     st.sidebar.caption("Working in standalone mode with embedded models.")
 else:
@@ -69,52 +138,151 @@ else:
     st.sidebar.warning("Ensure API is running or models are in 'ml_core/models/'")
 
 @st.cache_data
-def load_data(uploaded_file=None):
+def load_data(columns=None):
+    # Only the columns a page needs are read from the feature store
+    from analytics.feature_store import read_features
     try:
-        if uploaded_file is not None:
-             return pd.read_csv(uploaded_file)
-        return pd.read_csv(DATA_PATH)
+        with LOAD_SECONDS.time(source='feature_store'):
+            return read_features(columns=columns)
     except FileNotFoundError:
         return None
 
-df = load_data(uploaded_file)
+@st.cache_data
+def load_rollup_views(version=None):
+    # Pre-aggregated views; `version` (rollup mtime) invalidates the cache after an ETL run
+    from analytics.rollups import ROLLUP_COLUMNS, compute_rollups, load_rollups
+    with LOAD_SECONDS.time(source='rollups'):
+        rollups = load_rollups()
+    if rollups is not None:
+        return rollups
+    # No materialized rollups yet: aggregate the raw rows once
+    df = load_data(columns=ROLLUP_COLUMNS)
+    if df is None:
+        return None
+    with LOAD_SECONDS.time(source='compute_rollups'):
+        return compute_rollups(df)
+
+# Upload caches are keyed by file_id: hashing a multi-GB upload on every rerun would be slow
+@st.cache_data(max_entries=2)
+def summarize_upload(file_id, _uploaded_file):
+    """One streamed pass over the upload: (rollups, random sample, row count, error).
+
+    `error` says why the file cannot be analyzed (rollups is then None); it is
+    cached too, so a bad file is not parsed again on every rerun.
+    """
+    from analytics.rollups import summarize_csv
+    _uploaded_file.seek(0)
+    try:
+        with LOAD_SECONDS.time(source='upload'):
+            return summarize_csv(_uploaded_file, UPLOAD_CHUNK_ROWS, PREVIEW_SAMPLE_ROWS) + (None,)
+    except ValueError as e:
+        # Not a CSV, a missing transaction column, or a value that is not a number
+        return None, None, 0, str(e)
+
+def get_rollups(uploaded_file=None):
+    from analytics.rollups import rollups_version
+    if uploaded_file is not None:
+        rollups, _, _, error = summarize_upload(uploaded_file.file_id, uploaded_file)
+        if error:
+            st.error(f"Cannot analyze {uploaded_file.name}: {error}.")
+        return rollups
+    return load_rollup_views(rollups_version())
+
+@st.cache_data(max_entries=16)
+def render_chart(chart, data_version, _rollups):
+    """PNG of one EDA chart; `data_version` (rollup mtime or upload id) invalidates it.
+
+    matplotlib and seaborn are only imported here, so other pages never pay for them.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from analytics.rollups import add_statistics, binned_kde, coarsen_amount_bins
+
+    with RENDER_SECONDS.time(chart=chart):
+        if chart == 'segment_volume':
+            fig, ax = plt.subplots()
+            sns.barplot(x='segment', y='amount_sum', data=_rollups['segment'], errorbar=None, ax=ax)
+            ax.set_ylabel('amount')
+        elif chart == 'amount_distribution':
+            fig, ax = plt.subplots()
+            # Wide amount ranges are drawn with wider bins
+            amount_bins, bin_width = coarsen_amount_bins(_rollups['amount_bin'])
+            ax.bar(amount_bins['amount_bin'], amount_bins['count'], width=bin_width, align='edge', alpha=0.6)
+            centres, kde = binned_kde(amount_bins, bin_width)
+            ax.plot(centres, kde)
+            ax.set_xlabel('amount')
+            ax.set_ylabel('Count')
+        else:
+            fig, ax = plt.subplots(figsize=(10, 4))
+            # Mean and 95% CI per hour come straight from the hourly rollup
+            hourly = add_statistics(_rollups['hour'])
+            ax.plot(hourly['tx_hour'], hourly['amount_mean'])
+            ax.fill_between(hourly['tx_hour'], hourly['ci_low'], hourly['ci_high'], alpha=0.2)
+            ax.set_xlabel('tx_hour')
+            ax.set_ylabel('amount')
+        # Same output as st.pyplot
+        image = io.BytesIO()
+        fig.savefig(image, format='png', bbox_inches='tight', dpi=200)
+        plt.close(fig)
+    return image.getvalue()
+
+@st.cache_data(max_entries=2)
+def load_preview(file_id=None, _uploaded_file=None):
+    from analytics.feature_store import preview_features
+    try:
+        if _uploaded_file is not None:
+            _uploaded_file.seek(0)
+            return pd.read_csv(_uploaded_file, nrows=10)
+        return preview_features(10)
+    except FileNotFoundError:
+        return None
 
 if page == "Overview":
     st.markdown("#### System Metrics (Simulated Legacy Integration)")
-    if df is not None:
+    from analytics.rollups import totals
+    rollups = get_rollups(uploaded_file)
+    if rollups is not None:
+        summary = totals(rollups)
         col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Total Transactions", f"{len(df):,}")
-        col2.metric("Total Volume", f"${df['amount'].sum():,.0f}")
-        col3.metric("Avg Transaction", f"${df['amount'].mean():.2f}")
-        col4.metric("High Priority/Risk", f"{df['is_high_value'].sum():,}")
+        col1.metric("Total Transactions", f"{summary['count']:,}")
+        col2.metric("Total Volume", f"${summary['amount_sum']:,.0f}")
+        col3.metric("Avg Transaction", f"${summary['amount_mean']:.2f}")
+        col4.metric("High Priority/Risk", f"{summary['high_value_count']:,}")
         
         st.markdown("---")
         st.subheader("Recent Data Preview")
-        st.dataframe(df.head(10), use_container_width=True)
-    else:
+        if uploaded_file is not None and st.checkbox(f"Show a random sample of up to {PREVIEW_SAMPLE_ROWS:,} rows"):
+            _, sample, rows, _ = summarize_upload(uploaded_file.file_id, uploaded_file)
+            st.caption(f"Uniform sample of {len(sample):,} out of {rows:,} uploaded rows.")
+            st.dataframe(sample, use_container_width=True)
+        elif uploaded_file is not None:
+            st.dataframe(load_preview(uploaded_file.file_id, uploaded_file), use_container_width=True)
+        else:
+            st.dataframe(load_preview(), use_container_width=True)
+    elif uploaded_file is None:
         st.error("Data not found. Please run the ETL process.")
 
 elif page == "Data Analysis (EDA)":
     st.header("Exploratory Data Analysis")
-    if df is not None:
+    from analytics.rollups import rollups_version
+    rollups = get_rollups(uploaded_file)
+    if rollups is not None:
+        # Figures are rendered once per data version and reused by every session and rerun
+        data_version = uploaded_file.file_id if uploaded_file is not None else rollups_version()
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("Transaction Volume by Segment")
-            fig, ax = plt.subplots()
-            sns.barplot(x='segment', y='amount', data=df, estimator=sum, errorbar=None, ax=ax)
-            st.pyplot(fig)
+            st.image(render_chart('segment_volume', data_version, rollups))
             
         with col2:
             st.subheader("Transaction Distribution")
-            fig, ax = plt.subplots()
-            sns.histplot(df['amount'], bins=30, kde=True, ax=ax)
-            st.pyplot(fig)
+            st.image(render_chart('amount_distribution', data_version, rollups))
             
         st.subheader("Time Analysis")
-        fig, ax = plt.subplots(figsize=(10, 4))
-        sns.lineplot(x='tx_hour', y='amount', data=df, ax=ax)
-        st.pyplot(fig)
+        st.image(render_chart('hourly_amount', data_version, rollups))
 
 elif page == "AI Predictions":
     st.header("Real-time AI Scoring (via FastAPI)")
@@ -138,35 +306,43 @@ elif page == "AI Predictions":
                 "account_age_days": age,
                 "amount": amount
             }
-            try:
-                # Call Risk API
-                r_risk = requests.post(f"{API_URL}/predict/risk", json=payload)
-                # Call Segment API
-                r_seg = requests.post(f"{API_URL}/predict/segment", json=payload)
-                
-                if r_risk.status_code == 200 and r_seg.status_code == 200:
-                    risk_data = r_risk.json()
-                    seg_data = r_seg.json()
+            response = None
+            if api_online:
+                try:
+                    # Risk and segment in one round trip
+                    response = api_session().post(f"{API_URL}/predict", json=payload, timeout=API_TIMEOUT)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    api_health().mark(False)
+
+            if response is not None:
+                if response.status_code == 200:
+                    prediction = response.json()
                     
                     st.success("Prediction Successful")
                     st.json({
-                        "Risk Score": risk_data['risk_score'],
-                        "High Value/Risk": risk_data['is_high_risk'],
-                        "Customer Segment Cluster": seg_data['segment_cluster']
+                        "Risk Score": prediction['risk_score'],
+                        "High Value/Risk": prediction['is_high_risk'],
+                        "Customer Segment Cluster": prediction['segment_cluster']
                     })
                 else:
                     st.error("API Error. Ensure FastAPI is running.")
-            except requests.exceptions.ConnectionError:
+            else:
                 # Local Fallback
+                local_models = load_local_models()
                 if local_models:
                     st.info("Using local model inference (API offline)")
-                    features = [[hour, dow, age]]
+                    features = risk_input.fill([(hour, dow, age)])
                     # Risk
-                    risk_prob = local_models['lr'].predict_proba(features)[0][1]
-                    is_risk = local_models['lr'].predict(features)[0]
+                    lr_model = local_models.predictor('lr')
+                    with unnamed_features(lr_model):
+                        risk_prob = lr_model.predict_proba(features)[0][1]
+                    # Derived from the probability, as the API does, instead of scoring the row twice
+                    is_risk = risk_prob > RISK_THRESHOLD
                     # Segment (needs amount, hour)
-                    seg_features = [[amount, hour]]
-                    cluster = local_models['kmeans'].predict(seg_features)[0]
+                    seg_features = segment_input.fill([(amount, hour)])
+                    kmeans_model = local_models.predictor('kmeans')
+                    with unnamed_features(kmeans_model):
+                        cluster = kmeans_model.predict(seg_features)[0]
                     
                     st.success("Prediction Successful (Local)")
                     st.json({
@@ -182,27 +358,78 @@ elif page == "AI Predictions":
 elif page == "AI Code Assistant (GenAI)":
     st.header("Intelligence: AI Code Modernization Assistant")
     st.markdown("This tool scans the legacy codebase and uses GenAI to generate documentation and modernization suggestions.")
+    # Only this page needs the code index
+    from code_index import update_index, load_index, risk_level, recommendation
     
     if st.button("🚀 Start Codebase Analysis"):
         with st.spinner("Analyzing codebase architecture..."):
-            import glob
-            # Scans current project directories
-            base_scanner = os.path.dirname(os.path.abspath(__file__))
-            parent_dir = os.path.dirname(base_scanner)
-            files = glob.glob(f"{parent_dir}/**/*.py", recursive=True)
-            
-            st.success(f"Discovered {len(files)} modules in the system.")
-            
-            for file in files:
-                with st.expander(f"📝 {os.path.basename(file)}"):
-                    st.markdown(f"**Path:** `{file}`")
-                    st.markdown("""
-                    **GenAI Insights:**
-                    - **Summary**: This module handles critical components of the modernization pipeline.
-                    - **Risk Level**: Low
-                    - **Modernization Recommendation**: Implement unit tests and consider containerization for this module.
-                    """)
-                    st.code(f"# Analyzed on {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}\n# Complexity Score: 4/10", language='python')
+            # Incremental: only modules changed since the last analysis are parsed again
+            scan = update_index(CODE_ROOT)
+        st.success(f"Discovered {scan['files']} modules in the system "
+                   f"({scan['parsed']} newly analyzed in {scan['seconds']:.1f}s).")
+
+    # Results come straight from the persistent index, without rescanning
+    records = load_index(CODE_ROOT)
+    if not records:
+        st.info("No up-to-date analysis yet. Click the button above to index the codebase.")
+    else:
+        for record in records:
+            record['risk'] = risk_level(record)
+        # Most complex first; modules that fail to parse have no definition counts
+        records.sort(key=lambda record: (record['max_complexity'] or 0, record['sloc']), reverse=True)
+        index = pd.DataFrame(records)
+        counts = ['functions', 'classes', 'complexity', 'max_complexity']
+        index[counts] = index[counts].astype('Int64')
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Modules", f"{len(index):,}")
+        col2.metric("Lines of Code", f"{int(index['sloc'].sum()):,}")
+        col3.metric("Functions", f"{int(index['functions'].sum()):,}")
+        col4.metric("High-Risk Modules", int((index['risk'] == 'High').sum()))
+
+        st.dataframe(
+            index[['path', 'risk', 'sloc', 'functions', 'classes', 'complexity', 'max_complexity']],
+            hide_index=True, use_container_width=True
+        )
+
+        for record in records[:INSIGHT_MODULES]:
+            if record['parse_error']:
+                summary = f"{record['sloc']} lines of code that do not parse ({record['parse_error']})."
+            else:
+                summary = (f"{record['sloc']} lines of code, {record['functions']} functions and {record['classes']} "
+                           f"classes; imports {', '.join(record['imports'][:8]) or 'nothing'}.")
+            with st.expander(f"📝 {record['path']}"):
+                st.markdown(f"""
+                **GenAI Insights:**
+                - **Summary**: {summary}
+                - **Risk Level**: {record['risk']}
+                - **Modernization Recommendation**: {recommendation(record)}
+                """)
+                st.code(f"# Cyclomatic complexity: {record['complexity']} total, {record['max_complexity']} in the most complex function", language='python')
 
 st.sidebar.markdown("---")
 st.sidebar.info("Legacy Java App -> DB -> ETL -> ML -> API -> Dashboard")
+
+@st.cache_resource
+def process_state():
+    # Lives as long as the dashboard process, unlike module globals (re-created on every run)
+    return {'painted': False}
+
+# Startup timing: the first run in a process is the cold start (first paint)
+run_seconds = time.perf_counter() - RUN_STARTED
+SCRIPT_SECONDS.observe(run_seconds, page=page)
+if not process_state()['painted']:
+    process_state()['painted'] = True
+    FIRST_PAINT_SECONDS.observe(run_seconds)
+
+# Load and render timings recorded by this dashboard process
+with st.sidebar.expander("Performance"):
+    timings = [
+        {"metric": f"{name.replace('dashboard_', '').replace('_seconds', '')}{labels}",
+         "count": stats['count'], "mean_ms": stats['mean'] * 1000, "max_ms": stats['max'] * 1000}
+        for name, series in metrics.summary().items() if name.startswith('dashboard_')
+        for labels, stats in series.items()
+    ]
+    if timings:
+        st.dataframe(pd.DataFrame(timings).round(1), hide_index=True, use_container_width=True)
+    else:
+        st.caption("No timings recorded yet.")
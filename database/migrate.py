@@ -0,0 +1,44 @@
+import argparse
+import glob
+import os
+import sqlite3
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.getenv("LEGACY_DB_PATH", os.path.join(BASE_DIR, 'legacy_system.db'))
+MIGRATIONS_DIR = os.path.join(BASE_DIR, 'migrations')
+
+def applied_migrations(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+def migrate(db_path=None):
+    """Applies every migrations/*.sql file not yet recorded in schema_migrations, in name order."""
+    conn = sqlite3.connect(db_path or DB_PATH)
+    try:
+        done = applied_migrations(conn)
+        for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, '*.sql'))):
+            version = os.path.splitext(os.path.basename(path))[0]
+            if version in done:
+                continue
+            print(f"Applying {version}...")
+            with open(path, 'r') as f:
+                conn.executescript(f.read())
+            conn.execute("INSERT INTO schema_migrations (version) VALUES (?)", (version,))
+            conn.commit()
+        # Refresh planner statistics so the new indexes are picked up
+        conn.execute("ANALYZE")
+        conn.commit()
+        print("Database is up to date.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations to the legacy database.")
+    parser.add_argument("--db", default=None, help="Database path (default: database/legacy_system.db)")
+    args = parser.parse_args()
+    migrate(args.db)
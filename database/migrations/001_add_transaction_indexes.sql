@@ -0,0 +1,14 @@
+-- Secondary indexes for the ETL, the nightly batch and the nightly report
+-- Compatible with SQLite
+
+-- Customer lookups and customer_id range reads
+CREATE INDEX IF NOT EXISTS idx_transactions_customer_id ON transactions(customer_id);
+
+-- Partial index holding only the PENDING backlog, used by the nightly batch count and update
+CREATE INDEX IF NOT EXISTS idx_transactions_pending ON transactions(transaction_id) WHERE status = 'PENDING';
+
+-- Covering index for the nightly summary (date range filter + sum(amount))
+CREATE INDEX IF NOT EXISTS idx_transactions_date_amount ON transactions(transaction_date, amount);
+
+-- Incremental ETL watermark on rows moved from PENDING to PROCESSED
+CREATE INDEX IF NOT EXISTS idx_transactions_processed_at ON transactions(processed_at);
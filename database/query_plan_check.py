@@ -0,0 +1,103 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, '..'))
+DB_PATH = os.getenv("LEGACY_DB_PATH", os.path.join(BASE_DIR, 'legacy_system.db'))
+
+from analytics.etl_process import EXTRACT_QUERY, INCREMENTAL_FILTER, WATERMARK_QUERY, RANGE_FILTER, ID_BOUNDS_QUERY
+from legacy_app.batch_processor import (
+    PENDING_COUNT_QUERY, CHUNK_END_QUERY, MARK_PROCESSED_QUERY, NIGHTLY_SUMMARY_QUERY, DEFAULT_CHUNK_SIZE, day_range
+)
+
+def _recent_watermark(conn):
+    # A watermark ~1000 rows behind the head, i.e. a typical nightly delta
+    max_id, max_processed_at = conn.execute(WATERMARK_QUERY).fetchone()
+    return (max((max_id or 0) - 1000, 0), max_processed_at or '')
+
+# Every query the project issues: (name, sql, params or callable(conn) -> params, tables allowed to be scanned).
+# Full extracts read every row by design, so scanning their driving table is expected.
+PROJECT_QUERIES = [
+    ("etl: full extract", EXTRACT_QUERY, (), {'t'}),
+    ("etl: incremental extract", EXTRACT_QUERY + INCREMENTAL_FILTER, _recent_watermark, set()),
+    ("etl: watermark", WATERMARK_QUERY, (), set()),
+    ("seed: customer ids", "SELECT customer_id FROM customers", (), {'customers'}),
+    ("etl/score: id bounds", ID_BOUNDS_QUERY, (), set()),
+    ("etl/score: shard chunk extract", EXTRACT_QUERY + RANGE_FILTER, (0, 100_000), set()),
+    # legacy_app/batch_processor.py (replaces BatchProcessor.java)
+    ("batch: pending count", PENDING_COUNT_QUERY, (), set()),
+    ("batch: chunk end", CHUNK_END_QUERY, (0, DEFAULT_CHUNK_SIZE), set()),
+    ("batch: mark processed chunk", MARK_PROCESSED_QUERY, (0, DEFAULT_CHUNK_SIZE), set()),
+    ("batch: nightly report", NIGHTLY_SUMMARY_QUERY, lambda conn: day_range(), set()),
+]
+
+SCAN_PATTERN = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+
+def partial_indexes(conn):
+    rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")
+    return {name for name, sql in rows if ' WHERE ' in sql.upper()}
+
+def explain(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+def full_scans(plan, allowed, partial):
+    """Plan lines that read a whole table (or a whole non-partial index) not in `allowed`."""
+    found = []
+    for detail in plan:
+        match = SCAN_PATTERN.match(detail)
+        if not match or match.group(1) in allowed or match.group(1) == 'CONSTANT':
+            continue
+        index = match.group(2)
+        if index is None or index not in partial:
+            found.append(detail)
+    return found
+
+def time_query(conn, sql, params, repeat=3):
+    """Best-of-`repeat` wall time in ms; writes are rolled back."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute("BEGIN")
+        try:
+            conn.execute(sql, params).fetchall()
+        finally:
+            conn.rollback()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def check(db_path=None, timing=False):
+    conn = sqlite3.connect(db_path or DB_PATH, isolation_level=None)
+    try:
+        row_count = conn.execute("SELECT count(*) FROM transactions").fetchone()[0]
+        print(f"Checking {len(PROJECT_QUERIES)} queries against {db_path or DB_PATH} ({row_count:,} transactions)")
+        partial = partial_indexes(conn)
+        failures = 0
+        for name, sql, params, allowed in PROJECT_QUERIES:
+            if callable(params):
+                params = params(conn)
+            plan = explain(conn, sql, params)
+            scans = full_scans(plan, allowed, partial)
+            status = "FULL SCAN" if scans else "ok"
+            line = f"[{status}] {name}: {' | '.join(plan)}"
+            if timing:
+                line += f" ({time_query(conn, sql, params):.1f} ms)"
+            print(line)
+            failures += bool(scans)
+    finally:
+        conn.close()
+
+    if failures:
+        print(f"{failures} queries regressed to a full table scan. Run database/migrate.py or fix the query.")
+    return failures == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if any project query needs an unexpected full table scan.")
+    parser.add_argument("--db", default=None, help="Database path (default: database/legacy_system.db)")
+    parser.add_argument("--timing", action="store_true", help="Also execute each query and report its run time.")
+    args = parser.parse_args()
+    sys.exit(0 if check(args.db, timing=args.timing) else 1)
@@ -26,3 +26,17 @@ CREATE TABLE IF NOT EXISTS system_logs (
     message TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+-- Indexes (existing databases get them from migrations/001_add_transaction_indexes.sql)
+
+-- Customer lookups and customer_id range reads
+CREATE INDEX IF NOT EXISTS idx_transactions_customer_id ON transactions(customer_id);
+
+-- Partial index holding only the PENDING backlog, used by the nightly batch count and update
+CREATE INDEX IF NOT EXISTS idx_transactions_pending ON transactions(transaction_id) WHERE status = 'PENDING';
+
+-- Covering index for the nightly summary (date range filter + sum(amount))
+CREATE INDEX IF NOT EXISTS idx_transactions_date_amount ON transactions(transaction_date, amount);
+
+-- Incremental ETL watermark on rows moved from PENDING to PROCESSED
+CREATE INDEX IF NOT EXISTS idx_transactions_processed_at ON transactions(processed_at);
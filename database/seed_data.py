@@ -1,55 +1,67 @@
 import sqlite3
 import random
 import datetime
+import argparse
+import time
+import os
+import numpy as np
 from faker import Faker
 
 fake = Faker()
-DB_PATH = 'legacy_system.db'
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.getenv("LEGACY_DB_PATH", os.path.join(BASE_DIR, 'legacy_system.db'))
+SCHEMA_PATH = os.path.join(BASE_DIR, 'schema.sql')
 
-def create_connection():
+SEGMENTS = ['RETAIL', 'CORPORATE', 'SME']
+TRANSACTION_TYPES = ['DEBIT', 'CREDIT', 'TRANSFER']
+STATUSES = ['PROCESSED', 'FAILED', 'PENDING'] # Most should be processed
+STATUS_WEIGHTS = [90, 5, 5]
+
+def create_connection(db_path=None):
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = sqlite3.connect(db_path or DB_PATH)
         return conn
     except sqlite3.Error as e:
         print(e)
     return None
 
 def init_db(conn):
-    with open('schema.sql', 'r') as f:
+    with open(SCHEMA_PATH, 'r') as f:
         schema = f.read()
     conn.executescript(schema)
     print("Database initialized.")
 
-def generate_data(conn, num_customers=100, num_transactions=2000):
+def generate_customers(conn, num_customers):
     cursor = conn.cursor()
-    
+
     print(f"Generating {num_customers} customers...")
     customers = []
-    segments = ['RETAIL', 'CORPORATE', 'SME']
     for _ in range(num_customers):
         customers.append((
             fake.name(),
             fake.email(),
-            random.choice(segments),
+            random.choice(SEGMENTS),
             fake.date_between(start_date='-5y', end_date='today')
         ))
     
     cursor.executemany("INSERT INTO customers (name, email, segment, account_created_date) VALUES (?, ?, ?, ?)", customers)
     conn.commit()
-    
-    print(f"Generating {num_transactions} transactions...")
+
     cursor.execute("SELECT customer_id FROM customers")
-    customer_ids = [row[0] for row in cursor.fetchall()]
+    return [row[0] for row in cursor.fetchall()]
+
+def generate_data(conn, num_customers=100, num_transactions=2000):
+    cursor = conn.cursor()
+    customer_ids = generate_customers(conn, num_customers)
     
+    print(f"Generating {num_transactions} transactions...")
     transactions = []
-    types = ['DEBIT', 'CREDIT', 'TRANSFER']
-    statuses = ['PROCESSED', 'FAILED', 'PENDING'] # Most should be processed
     
     for _ in range(num_transactions):
         cust_id = random.choice(customer_ids)
         amount = round(random.uniform(10.0, 5000.0), 2)
-        tx_type = random.choice(types)
-        status = random.choices(statuses, weights=[90, 5, 5], k=1)[0]
+        tx_type = random.choice(TRANSACTION_TYPES)
+        status = random.choices(STATUSES, weights=STATUS_WEIGHTS, k=1)[0]
         date = fake.date_time_between(start_date='-1y', end_date='now')
         
         processed_at = date if status == 'PROCESSED' else None
@@ -67,9 +79,94 @@ def generate_data(conn, num_customers=100, num_transactions=2000):
     conn.commit()
     print("Data generation complete.")
 
+def _format_timestamps(micros):
+    """Formats epoch microseconds as 'YYYY-MM-DD HH:MM:SS.ffffff', the text sqlite3 stores for a datetime."""
+    text = np.datetime_as_string(micros.astype('datetime64[us]')).astype('U26')
+    # Swap the ISO 'T' separator for a space in place on the fixed-width buffer
+    text.view(np.uint32).reshape(len(text), 26)[:, 10] = ord(' ')
+    return text
+
+def generate_data_bulk(conn, num_customers=100, num_transactions=2000, batch_size=500_000, seed=None):
+    """Scalable generator: same distributions as generate_data, built in vectorized NumPy batches.
+
+    Faker is only used for the (small) customers table. Transactions are
+    written in one SQLite transaction per batch with write-optimized PRAGMAs,
+    and secondary indexes are rebuilt once at the end when loading into an
+    empty or smaller table.
+    """
+    rng = np.random.default_rng(seed)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144") # 256 MB page cache
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+    customer_ids = np.array(generate_customers(conn, num_customers))
+
+    # Maintaining indexes row by row is slower than building them once after the load
+    existing_rows = conn.execute("SELECT count(*) FROM transactions").fetchone()[0]
+    indexes = []
+    if num_transactions >= existing_rows:
+        indexes = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions' AND sql IS NOT NULL"
+        ).fetchall()
+        for name, _ in indexes:
+            conn.execute(f"DROP INDEX {name}")
+
+    print(f"Generating {num_transactions:,} transactions in batches of {batch_size:,}...")
+    now = int(time.time() * 1_000_000)
+    one_year = 365 * 24 * 3600 * 1_000_000
+    types = np.array(TRANSACTION_TYPES)
+    statuses = np.array(STATUSES)
+    status_p = np.array(STATUS_WEIGHTS) / sum(STATUS_WEIGHTS)
+    start = time.perf_counter()
+
+    written = 0
+    while written < num_transactions:
+        n = min(batch_size, num_transactions - written)
+        dates = _format_timestamps(rng.integers(now - one_year, now, size=n))
+        status = statuses[rng.choice(len(statuses), size=n, p=status_p)]
+        processed_at = np.where(status == 'PROCESSED', dates, None)
+
+        rows = zip(
+            customer_ids[rng.integers(0, len(customer_ids), size=n)].tolist(),
+            np.round(rng.uniform(10.0, 5000.0, size=n), 2).tolist(),
+            types[rng.integers(0, len(types), size=n)].tolist(),
+            dates.tolist(),
+            status.tolist(),
+            processed_at.tolist()
+        )
+        with conn:
+            conn.executemany("INSERT INTO transactions (customer_id, amount, transaction_type, transaction_date, status, processed_at) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        written += n
+        print(f"  {written:,} / {num_transactions:,} rows")
+
+    if indexes:
+        print("Rebuilding indexes...")
+        for _, sql in indexes:
+            conn.execute(sql)
+        conn.execute("ANALYZE")
+        conn.commit()
+
+    conn.execute("PRAGMA synchronous = FULL")
+    elapsed = time.perf_counter() - start
+    print(f"Data generation complete: {written:,} rows in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/sec).")
+
 if __name__ == '__main__':
-    conn = create_connection()
+    parser = argparse.ArgumentParser(description="Create the legacy database and fill it with simulated data.")
+    parser.add_argument("--db", default=None, help="Database path (default: database/legacy_system.db)")
+    parser.add_argument("--customers", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=2000)
+    parser.add_argument("--bulk", action="store_true",
+                        help="Use the vectorized generator (for millions of transactions).")
+    parser.add_argument("--batch-size", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for --bulk runs.")
+    args = parser.parse_args()
+
+    conn = create_connection(args.db)
     if conn:
         init_db(conn)
-        generate_data(conn)
+        if args.bulk:
+            generate_data_bulk(conn, args.customers, args.transactions, args.batch_size, args.seed)
+        else:
+            generate_data(conn, args.customers, args.transactions)
         conn.close()
@@ -3,25 +3,29 @@
 # In a real scenario, this would use OpenAI API or LangChain.
 
 import os
-import glob
+
+from code_index import update_index, load_index, risk_level, recommendation
 
 def auto_document_code(directory):
     print(f"Scanning {directory} for code files...")
-    files = glob.glob(f"{directory}/**/*.py", recursive=True)
-    
-    print(f"Found {len(files)} Python files. Starting GenAI documentation process...\n")
-    
+    # Only files changed since the last scan are parsed again
+    stats = update_index(directory)
+    files = load_index(directory)
+
+    print(f"Found {len(files)} Python files ({stats['parsed']} newly analyzed). Starting GenAI documentation process...\n")
+
     for file in files:
-        print(f"Processing {file}...")
-        # Mocking LLM Call
+        print(f"Processing {file['path']}...")
+        # Mocking LLM Call, prompted with the indexed metrics
         # response = openai.ChatCompletion.create(...)
-        
+
         docstring = f"""
         [GenAI Auto-Generated Documentation]
-        File: {os.path.basename(file)}
-        Summary: This module contains logic for the Intelligent Modernization System.
-        Complexity: Medium
-        Suggestions: Consider refactoring for better modularity.
+        File: {os.path.basename(file['path'])}
+        Size: {file['loc']} lines ({file['sloc']} code), {file['functions']} functions, {file['classes']} classes
+        Imports: {', '.join(file['imports']) or 'none'}
+        Complexity: {risk_level(file)} (max cyclomatic complexity {file['max_complexity']})
+        Suggestions: {recommendation(file)}
         """
         print(docstring)
         print("-" * 40)
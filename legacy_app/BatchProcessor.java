@@ -11,6 +11,9 @@ import java.util.Date;
  * BatchProcessor.java
  * Simulates a legacy nightly batch job that processes transactions.
  * In a real scenario, this would be a complex enterprise job.
+ *
+ * Superseded by batch_processor.py, which processes the backlog in short
+ * chunked transactions in WAL mode instead of one unbounded UPDATE.
  */
 public class BatchProcessor {
 
@@ -55,7 +58,9 @@ public class BatchProcessor {
 
     private static void generateNightlyReport(Connection conn) throws SQLException {
         System.out.println("Generating Nightly Summary...");
-        String query = "SELECT sum(amount) as total_volume, count(*) as tx_count FROM transactions WHERE date(transaction_date) = date('now')";
+        // Range filter instead of date(transaction_date) so idx_transactions_date_amount can be used
+        String query = "SELECT sum(amount) as total_volume, count(*) as tx_count FROM transactions "
+                + "WHERE transaction_date >= date('now') AND transaction_date < date('now', '+1 day')";
         try (PreparedStatement pstmt = conn.prepareStatement(query);
              ResultSet rs = pstmt.executeQuery()) {
             if (rs.next()) {
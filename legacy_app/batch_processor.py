@@ -0,0 +1,136 @@
+import sqlite3
+import argparse
+import datetime
+import time
+import sys
+import os
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, '..'))
+DB_PATH = os.getenv("LEGACY_DB_PATH", os.path.join(BASE_DIR, '../database/legacy_system.db'))
+
+from monitoring import metrics
+
+CHUNK_SECONDS = metrics.histogram('batch_processor_chunk_seconds', 'Write transaction time per chunk.')
+ROWS = metrics.counter('batch_processor_rows_total', 'PENDING transactions marked PROCESSED.')
+
+# Rows per write transaction: bounds how long the write lock is held, whatever the backlog size
+DEFAULT_CHUNK_SIZE = 5_000
+# How long a chunk waits for the write lock (e.g. behind another writer) before failing
+BUSY_TIMEOUT_SECONDS = 30
+
+PENDING_COUNT_QUERY = "SELECT count(*) FROM transactions WHERE status = 'PENDING'"
+# Last id of the next chunk of the backlog, read in id order from the partial index idx_transactions_pending
+CHUNK_END_QUERY = """
+    SELECT MAX(transaction_id) FROM (
+        SELECT transaction_id FROM transactions
+        WHERE status = 'PENDING' AND transaction_id > ?
+        ORDER BY transaction_id
+        LIMIT ?
+    )
+    """
+# Millisecond timestamps (CURRENT_TIMESTAMP only has seconds), so chunks committed
+# while the ETL runs rarely share a timestamp with its processed_at watermark
+MARK_PROCESSED_QUERY = """
+    UPDATE transactions SET status = 'PROCESSED', processed_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE status = 'PENDING' AND transaction_id > ? AND transaction_id <= ?
+    """
+# A half-open range on the raw column (instead of date(transaction_date) = ...) is answered
+# from the covering index idx_transactions_date_amount
+NIGHTLY_SUMMARY_QUERY = """
+    SELECT sum(amount) AS total_volume, count(*) AS tx_count FROM transactions
+    WHERE transaction_date >= ? AND transaction_date < ?
+    """
+
+def connect(db_path=None):
+    """Opens the legacy database in WAL mode.
+
+    With WAL, readers (the ETL extract, the dashboard) keep reading the last
+    committed snapshot while a chunk is being written, and the writer never
+    waits for them. The mode is stored in the database file, so it stays on
+    for every later connection.
+    """
+    conn = sqlite3.connect(db_path or DB_PATH, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    # Safe with WAL: a power loss can only roll back the last commits, never corrupt the file
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+def process_transactions(conn, chunk_size=DEFAULT_CHUNK_SIZE, pause=0.0):
+    """Marks every PENDING transaction PROCESSED, one transaction_id range of at most `chunk_size` rows at a time.
+
+    Each chunk is its own short write transaction, so the write lock is only
+    held for one chunk. A failure leaves earlier chunks committed; rerunning
+    picks up the remaining PENDING rows. `pause` seconds are slept between
+    chunks to leave room for other writers.
+    """
+    print("Scanning for pending transactions...")
+    pending = conn.execute(PENDING_COUNT_QUERY).fetchone()[0]
+    print(f"Found {pending} pending transactions. Processing in chunks of {chunk_size:,}...")
+
+    processed, chunks, last_id = 0, 0, 0
+    while True:
+        start = time.perf_counter()
+        # BEGIN IMMEDIATE takes the write lock up front instead of upgrading a read lock mid-transaction
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            end_id = conn.execute(CHUNK_END_QUERY, (last_id, chunk_size)).fetchone()[0]
+            if end_id is None:
+                conn.execute("COMMIT")
+                break
+            rows = conn.execute(MARK_PROCESSED_QUERY, (last_id, end_id)).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        CHUNK_SECONDS.observe(time.perf_counter() - start)
+        ROWS.inc(rows)
+        processed += rows
+        chunks += 1
+        last_id = end_id
+        if pause:
+            time.sleep(pause)
+
+    print(f"Successfully processed {processed} transactions in {chunks} chunks.")
+    return processed
+
+def day_range(day=None):
+    """[start, end) timestamps of `day` (default: today in UTC, like SQLite's date('now'))."""
+    day = day or datetime.datetime.now(datetime.timezone.utc).date()
+    return day.isoformat(), (day + datetime.timedelta(days=1)).isoformat()
+
+def generate_nightly_report(conn, day=None):
+    print("Generating Nightly Summary...")
+    total_volume, tx_count = conn.execute(NIGHTLY_SUMMARY_QUERY, day_range(day)).fetchone()
+    print(f"Today's Volume: ${total_volume or 0.0:,.2f}")
+    print(f"Today's Transaction Count: {tx_count}")
+    return {'total_volume': total_volume or 0.0, 'tx_count': tx_count}
+
+def run_batch(db_path=None, chunk_size=DEFAULT_CHUNK_SIZE, pause=0.0, day=None):
+    print(f"Starting Nightly Batch Process at {time.ctime()}")
+    start = time.perf_counter()
+    conn = connect(db_path)
+    try:
+        processed = process_transactions(conn, chunk_size, pause)
+        report = generate_nightly_report(conn, day)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    summary_path = metrics.write_run_summary('batch_processor', {
+        'rows': processed, 'chunk_size': chunk_size, 'wall_s': round(elapsed, 3), 'report': report
+    })
+    print(f"Batch Process Completed at {time.ctime()} ({elapsed:.2f}s). Run summary: {summary_path}")
+    return processed, report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nightly batch: process PENDING transactions and report the day's volume.")
+    parser.add_argument("--db", default=None, help="Database path (default: database/legacy_system.db)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Transactions updated per write transaction.")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between chunks.")
+    parser.add_argument("--date", type=datetime.date.fromisoformat, default=None,
+                        help="Day to summarize, YYYY-MM-DD (default: today, UTC).")
+    args = parser.parse_args()
+    run_batch(args.db, args.chunk_size, args.pause, args.date)
@@ -0,0 +1,177 @@
+import sqlite3
+import pandas as pd
+import multiprocessing
+import argparse
+import shutil
+import time
+import uuid
+import sys
+import os
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, '..'))
+DB_PATH = os.getenv("LEGACY_DB_PATH", os.path.join(BASE_DIR, '../database/legacy_system.db'))
+SCORES_PATH = os.getenv("SCORES_PATH", os.path.join(BASE_DIR, 'scores'))
+
+from analytics.etl_process import EXTRACT_QUERY, RANGE_FILTER, ID_BOUNDS_QUERY, shard_ranges, transform_data
+from analytics.features import MODEL_FEATURES
+from ml_core.registry import ModelRegistry
+from monitoring import metrics
+from monitoring.metrics import peak_memory_mb
+
+STAGE_SECONDS = metrics.histogram('batch_score_stage_seconds', 'Duration of each stage, per chunk.', ['stage'])
+
+SCORES_TABLE = 'transaction_scores'
+SCORES_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {SCORES_TABLE} (
+        transaction_id INTEGER PRIMARY KEY,
+        risk_score REAL,
+        is_high_risk INTEGER,
+        rf_score REAL,
+        segment_cluster INTEGER,
+        model_version TEXT,
+        scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+SCORE_COLUMNS = ['transaction_id', 'risk_score', 'is_high_risk', 'rf_score', 'segment_cluster', 'model_version']
+INSERT_SCORES = (f"INSERT OR REPLACE INTO {SCORES_TABLE} ({', '.join(SCORE_COLUMNS)}) "
+                 f"VALUES ({', '.join('?' * len(SCORE_COLUMNS))})")
+
+# Same decision threshold as api_layer/main.py
+RISK_THRESHOLD = 0.5
+
+def score_chunk(models, df):
+    """Scores one raw extract chunk with every model in a single vectorized call each."""
+    clean = transform_data(df, verbose=False)
+    features = {name: models.features(name) or MODEL_FEATURES[name] for name in MODEL_FEATURES}
+
+    risk = models.get('lr').predict_proba(clean[features['lr']])[:, 1]
+    return pd.DataFrame({
+        'transaction_id': clean['transaction_id'].to_numpy(),
+        'risk_score': risk,
+        'is_high_risk': (risk > RISK_THRESHOLD).astype(int),
+        'rf_score': models.get('rf').predict_proba(clean[features['rf']])[:, 1],
+        'segment_cluster': models.get('kmeans').predict(clean[features['kmeans']]),
+        'model_version': models.version,
+    })
+
+def write_scores_sqlite(conn, scores):
+    # One transaction per chunk keeps commits (and fsyncs) rare
+    with conn:
+        conn.executemany(INSERT_SCORES, scores[SCORE_COLUMNS].itertuples(index=False, name=None))
+
+def write_scores_parquet(out_dir, scores):
+    scores.to_parquet(os.path.join(out_dir, f"part-{uuid.uuid4().hex}.parquet"), index=False)
+
+def score_shard(task):
+    """Pool worker: scores the transactions in one (start, end] id range chunk by chunk."""
+    db_path, model_dir, (start, end), chunk_size, output, out_dir, rf_jobs = task
+    models = ModelRegistry(model_dir)
+    models.get('rf').n_jobs = rf_jobs
+
+    conn = sqlite3.connect(db_path, timeout=300)
+    rows = 0
+    # (stage, seconds) per chunk, recorded by the parent since pool workers have their own metrics
+    timings = []
+    try:
+        for low in range(start, end, chunk_size):
+            high = min(low + chunk_size, end)
+            t0 = time.perf_counter()
+            df = pd.read_sql_query(EXTRACT_QUERY + RANGE_FILTER, conn, params=(low, high))
+            if df.empty:
+                continue
+            t1 = time.perf_counter()
+            scores = score_chunk(models, df)
+            t2 = time.perf_counter()
+            if output == 'sqlite':
+                write_scores_sqlite(conn, scores)
+            else:
+                write_scores_parquet(out_dir, scores)
+            timings += [('read', t1 - t0), ('score', t2 - t1), ('write', time.perf_counter() - t2)]
+            rows += len(scores)
+    finally:
+        conn.close()
+    return rows, peak_memory_mb(), timings
+
+def batch_score(db_path=None, model_dir=None, chunk_size=100_000, workers=1, output='sqlite', out_dir=None):
+    db_path = db_path or DB_PATH
+    out_dir = out_dir or SCORES_PATH
+    models = ModelRegistry(model_dir)
+    if not models.available():
+        print("Models not found. Please run train_models.py first.")
+        return None
+
+    conn = sqlite3.connect(db_path)
+    try:
+        low, high = conn.execute(ID_BOUNDS_QUERY).fetchone()
+        if output == 'sqlite':
+            conn.execute(SCORES_DDL)
+            conn.commit()
+    finally:
+        conn.close()
+    if low is None:
+        print("No transactions to score.")
+        return 0
+
+    # 1. Split the id range into one shard per worker
+    shards = shard_ranges(low - 1, high, workers)
+    staging = None
+    if output == 'parquet':
+        # Written aside and swapped in at the end, so readers never see a partial run
+        staging = f"{out_dir}.staging-{uuid.uuid4().hex}"
+        os.makedirs(staging)
+    # Forest prediction uses every core with one worker, one core each otherwise
+    rf_jobs = 1 if workers > 1 else -1
+    tasks = [(db_path, models.model_dir, shard, chunk_size, output, staging, rf_jobs) for shard in shards]
+
+    # 2. Score every shard
+    print(f"Scoring transactions {low}..{high} with model version {models.version} "
+          f"({len(shards)} shards, chunks of {chunk_size:,} ids, output: {output})...")
+    start = time.perf_counter()
+    if workers > 1:
+        with multiprocessing.Pool(processes=workers) as pool:
+            results = pool.map(score_shard, tasks)
+    else:
+        results = [score_shard(task) for task in tasks]
+    elapsed = time.perf_counter() - start
+
+    # 3. Publish Parquet output
+    if staging is not None:
+        old = f"{out_dir}.old-{uuid.uuid4().hex}"
+        if os.path.exists(out_dir):
+            os.rename(out_dir, old)
+        os.rename(staging, out_dir)
+        shutil.rmtree(old, ignore_errors=True)
+
+    rows = sum(r for r, _, _ in results)
+    peaks = [p for _, p, _ in results if p is not None]
+    for _, _, timings in results:
+        for stage, seconds in timings:
+            STAGE_SECONDS.observe(seconds, stage=stage)
+    destination = f"{SCORES_TABLE} in {db_path}" if output == 'sqlite' else out_dir
+    print(f"Scored {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec) into {destination}, "
+          f"peak memory per worker: {f'{max(peaks):.1f} MB' if peaks else 'n/a'}")
+    summary_path = metrics.write_run_summary('batch_score', {
+        'rows': rows,
+        'workers': workers,
+        'output': output,
+        'model_version': models.version,
+        'wall_s': round(elapsed, 3),
+        'rows_per_s': round(rows / max(elapsed, 1e-9), 1),
+        'worker_peak_rss_mb': max(peaks) if peaks else None
+    })
+    print(f"Run summary saved to {summary_path}")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score every transaction with the risk, forest and segment models.")
+    parser.add_argument("--db", default=None, help="Database path (default: database/legacy_system.db)")
+    parser.add_argument("--model-dir", default=None, help="Model registry directory (default: ml_core/models)")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Transaction ids read and scored per chunk.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes, each scoring one transaction_id range.")
+    parser.add_argument("--output", choices=['sqlite', 'parquet'], default='sqlite',
+                        help=f"Write to the {SCORES_TABLE} table or to Parquet files under SCORES_PATH.")
+    parser.add_argument("--out-dir", default=None, help="Parquet output directory (default: ml_core/scores)")
+    args = parser.parse_args()
+    batch_score(args.db, args.model_dir, args.chunk_size, args.workers, args.output, args.out_dir)
@@ -0,0 +1,194 @@
+import json
+import os
+import numpy as np
+
+# Written next to the joblib files of a registry version, one directory per model:
+# models/versions/<version>/compiled/<name>/{meta.json, <array>.npy}
+COMPILED_DIR = 'compiled'
+META_NAME = 'meta.json'
+
+# Largest probability difference from sklearn accepted by check_parity
+PARITY_TOLERANCE = 1e-9
+
+class CompiledModel:
+    """Scores from plain NumPy arrays; mirrors the predict/predict_proba API of the sklearn model.
+
+    Skips sklearn's per-call input validation and dispatch, which dominate
+    the cost of scoring one row. Inputs are taken positionally in
+    `feature_names_in_` order (DataFrames are reordered by name).
+    """
+    kind = None
+    arrays = ()
+
+    def __init__(self, features, classes, **arrays):
+        self.feature_names_in_ = np.asarray(features, dtype=object)
+        self.classes_ = np.asarray(classes)
+        for name in self.arrays:
+            setattr(self, name, arrays[name])
+
+    def _check(self, X, dtype=np.float64):
+        if hasattr(X, 'columns'):
+            X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self.feature_names_in_):
+            raise ValueError(f"Expected {len(self.feature_names_in_)} features, got {X.shape[1]}")
+        return X
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.arrays:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        meta = {
+            'kind': self.kind,
+            'features': list(self.feature_names_in_),
+            'classes': self.classes_.tolist(),
+        }
+        with open(os.path.join(directory, META_NAME), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+class CompiledLinear(CompiledModel):
+    """LogisticRegression / log-loss SGDClassifier: one matrix product and a sigmoid (softmax if multiclass)."""
+    kind = 'linear'
+    arrays = ('coef', 'intercept')
+
+    @classmethod
+    def from_sklearn(cls, model, features):
+        return cls(features, model.classes_, coef=np.ascontiguousarray(model.coef_.T, dtype=np.float64),
+                   intercept=np.asarray(model.intercept_, dtype=np.float64))
+
+    def decision_function(self, X):
+        return self._check(X) @ self.coef + self.intercept
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        if scores.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores))
+            return np.hstack([1.0 - positive, positive])
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if scores.shape[1] == 1:
+            return self.classes_[(scores[:, 0] > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+class CompiledKMeans(CompiledModel):
+    """KMeans / MiniBatchKMeans: nearest centroid by squared Euclidean distance."""
+    kind = 'kmeans'
+    arrays = ('centers',)
+
+    @classmethod
+    def from_sklearn(cls, model, features):
+        centers = np.ascontiguousarray(model.cluster_centers_, dtype=np.float64)
+        return cls(features, np.arange(len(centers)), centers=centers)
+
+    def predict(self, X):
+        X = self._check(X)
+        distances = ((X[:, None, :] - self.centers[None, :, :]) ** 2).sum(axis=2)
+        return distances.argmin(axis=1).astype(np.int32)
+
+class CompiledForest(CompiledModel):
+    """RandomForestClassifier flattened into contiguous node arrays shared by all trees.
+
+    Node i of the forest splits on `feature[i]` at `threshold[i]` and
+    continues at `left[i]` or `right[i]`; `roots` holds the first node of
+    each tree. Leaves point to themselves, so every (row, tree) pair steps
+    down together without checking for leaves until no node moves (at most
+    `max_depth` steps); `value` holds each leaf's class probabilities.
+
+    Without sklearn's per-tree dispatch a single row scores about 30x
+    faster; from a few hundred rows up sklearn's compiled tree code is
+    faster, so bulk scoring keeps using the sklearn model.
+    """
+    kind = 'forest'
+    arrays = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'max_depth')
+
+    # Rows traversed together; keeps the (rows x trees) working arrays in cache
+    BLOCK_ROWS = 2048
+
+    @classmethod
+    def from_sklearn(cls, model, features):
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            roots.append(offset)
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(np.where(leaf, np.inf, tree.threshold))
+            left.append(np.where(leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(leaf, nodes, tree.children_right) + offset)
+            counts = tree.value[:, 0, :]
+            value.append(counts / counts.sum(axis=1, keepdims=True))
+            offset += tree.node_count
+        return cls(
+            features, model.classes_,
+            feature=np.concatenate(feature).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            left=np.concatenate(left).astype(np.intp),
+            right=np.concatenate(right).astype(np.intp),
+            value=np.ascontiguousarray(np.concatenate(value), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=np.asarray(max(e.tree_.max_depth for e in model.estimators_)),
+        )
+
+    def _leaves(self, X):
+        # Flat offsets of each row's values; X is float32, the same comparison as sklearn's trees
+        offsets = (np.arange(len(X)) * X.shape[1])[:, None]
+        values = X.ravel()
+        node = np.repeat(self.roots[None, :], len(X), axis=0)
+        for _ in range(int(self.max_depth)):
+            go_left = values[offsets + self.feature[node]] <= self.threshold[node]
+            next_node = np.where(go_left, self.left[node], self.right[node])
+            if np.array_equal(next_node, node):
+                break
+            node = next_node
+        return node
+
+    def predict_proba(self, X):
+        X = self._check(X, dtype=np.float32)
+        out = np.empty((len(X), len(self.classes_)))
+        for start in range(0, len(X), self.BLOCK_ROWS):
+            block = X[start:start + self.BLOCK_ROWS]
+            out[start:start + len(block)] = self.value[self._leaves(block)].mean(axis=1)
+        return out
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+ENGINES = {engine.kind: engine for engine in (CompiledLinear, CompiledKMeans, CompiledForest)}
+
+def compile_model(model, features):
+    """Flattens a fitted sklearn model into a CompiledModel."""
+    if hasattr(model, 'estimators_'):
+        return CompiledForest.from_sklearn(model, features)
+    if hasattr(model, 'cluster_centers_'):
+        return CompiledKMeans.from_sklearn(model, features)
+    if hasattr(model, 'coef_'):
+        return CompiledLinear.from_sklearn(model, features)
+    raise TypeError(f"No compiled engine for {type(model).__name__}")
+
+def load_compiled(directory, mmap_mode='r'):
+    """Loads a compiled model saved by CompiledModel.save; arrays are memory-mapped by default."""
+    with open(os.path.join(directory, META_NAME), 'r') as f:
+        meta = json.load(f)
+    engine = ENGINES[meta['kind']]
+    # np.asarray drops the memmap subclass, whose per-operation overhead matters for single rows
+    arrays = {name: np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+              for name in engine.arrays}
+    return engine(meta['features'], meta['classes'], **arrays)
+
+def check_parity(model, compiled, X, tolerance=PARITY_TOLERANCE):
+    """Raises AssertionError unless `compiled` reproduces the sklearn model's outputs on X."""
+    if hasattr(model, 'predict_proba') and hasattr(compiled, 'predict_proba'):
+        expected, actual = model.predict_proba(X), compiled.predict_proba(X)
+        difference = float(np.abs(expected - actual).max()) if len(X) else 0.0
+        if difference > tolerance:
+            raise AssertionError(f"{type(model).__name__}: probabilities differ by up to {difference:.3g}")
+    mismatches = int((np.asarray(model.predict(X)) != compiled.predict(X)).sum())
+    if mismatches:
+        raise AssertionError(f"{type(model).__name__}: {mismatches} of {len(X)} predictions differ")
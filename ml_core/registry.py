@@ -0,0 +1,191 @@
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+
+from ml_core.compiled import COMPILED_DIR, load_compiled
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(BASE_DIR, 'models'))
+MANIFEST_NAME = 'manifest.json'
+VERSIONS_DIR = 'versions'
+# Older versions are pruned, but a few are kept for workers still serving them
+KEEP_VERSIONS = 3
+
+# Pre-registry artifacts, still loaded when no manifest exists
+LEGACY_FILES = {
+    'lr': 'logistic_regression.pkl',
+    'rf': 'random_forest.pkl',
+    'kmeans': 'kmeans.pkl',
+}
+
+def manifest_path(model_dir=None):
+    return os.path.join(model_dir or MODEL_DIR, MANIFEST_NAME)
+
+def read_manifest(model_dir=None):
+    path = manifest_path(model_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def registry_signature(model_dir=None):
+    """Cheap change marker for a model directory: mtimes of the manifest and legacy files."""
+    model_dir = model_dir or MODEL_DIR
+    paths = [manifest_path(model_dir)] + [os.path.join(model_dir, f) for f in LEGACY_FILES.values()]
+    return tuple(os.stat(p).st_mtime_ns if os.path.exists(p) else None for p in paths)
+
+def save_models(models, features, training_data_hash, metrics, model_dir=None, compiled=None):
+    """Writes a new registry version and points the manifest at it.
+
+    Each estimator is stored with uncompressed joblib under
+    models/versions/<version>/, so its NumPy arrays can be memory-mapped and
+    shared between worker processes, along with its `compiled` form (see
+    ml_core/compiled.py) if given. Files of a published version are never
+    rewritten; the manifest is swapped atomically as the last step.
+    """
+    import joblib
+    model_dir = model_dir or MODEL_DIR
+    version_dir, version = new_version_dir(model_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{training_data_hash[:8]}")
+
+    manifest = {
+        'version': version,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'training_data_hash': training_data_hash,
+        'models': {}
+    }
+    for name, model in models.items():
+        filename = f"{name}.joblib"
+        joblib.dump(model, os.path.join(version_dir, filename))
+        manifest['models'][name] = {
+            'file': f"{VERSIONS_DIR}/{version}/{filename}",
+            'class': type(model).__name__,
+            'features': features[name],
+            'metrics': metrics.get(name, {})
+        }
+        if compiled and name in compiled:
+            compiled[name].save(os.path.join(version_dir, COMPILED_DIR, name))
+            manifest['models'][name]['compiled'] = f"{VERSIONS_DIR}/{version}/{COMPILED_DIR}/{name}"
+
+    tmp_path = f"{manifest_path(model_dir)}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path(model_dir))
+
+    prune_versions(model_dir)
+    return manifest
+
+def new_version_dir(model_dir, base):
+    """Creates an empty directory for a new version named `base`, or `base-1`, `base-2`, ... if taken.
+
+    Two publishes of the same data within one second would otherwise share a
+    directory, and the second would overwrite files a running API may have
+    memory-mapped. The directory is created without exist_ok, so concurrent
+    publishers can never both claim the same name.
+    """
+    os.makedirs(os.path.join(model_dir, VERSIONS_DIR), exist_ok=True)
+    version, n = base, 0
+    while True:
+        version_dir = os.path.join(model_dir, VERSIONS_DIR, version)
+        try:
+            os.mkdir(version_dir)
+            return version_dir, version
+        except FileExistsError:
+            n += 1
+            version = f"{base}-{n}"
+
+def _version_order(versions_root, version):
+    # Names sort by hash within one second and put '-10' before '-2', so order by
+    # publish second, then by when the directory was last written, then by suffix
+    # <YYYYmmdd>-<HHMMSS>-<hash8>[-<n>]
+    parts = version.split('-')
+    suffix = int(parts[3]) if len(parts) > 3 and parts[3].isdigit() else 0
+    mtime = os.stat(os.path.join(versions_root, version)).st_mtime_ns
+    return '-'.join(parts[:2]), mtime, suffix
+
+def prune_versions(model_dir=None, keep=KEEP_VERSIONS):
+    """Removes all but the `keep` newest versions; the manifest's version is always kept."""
+    model_dir = model_dir or MODEL_DIR
+    versions_root = os.path.join(model_dir, VERSIONS_DIR)
+    manifest = read_manifest(model_dir)
+    current = manifest['version'] if manifest else None
+    versions = sorted((v for v in os.listdir(versions_root) if os.path.isdir(os.path.join(versions_root, v))),
+                      key=lambda v: _version_order(versions_root, v))
+    for old in versions[:-keep]:
+        if old != current:
+            shutil.rmtree(os.path.join(versions_root, old), ignore_errors=True)
+
+class ModelRegistry:
+    """Read side of the registry: loads each model lazily, the first time it is used."""
+
+    def __init__(self, model_dir=None, mmap_mode='r'):
+        self.model_dir = model_dir or MODEL_DIR
+        self.mmap_mode = mmap_mode
+        # Taken before reading the manifest, so a concurrent publish shows up as a change
+        self.signature = registry_signature(self.model_dir)
+        self.manifest = read_manifest(self.model_dir)
+        self.version = self.manifest['version'] if self.manifest else 'legacy'
+        self._models = {}
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        if self.manifest:
+            entry = self.manifest['models'].get(name)
+            return os.path.join(self.model_dir, entry['file']) if entry else None
+        if name in LEGACY_FILES:
+            return os.path.join(self.model_dir, LEGACY_FILES[name])
+        return None
+
+    def available(self, name=None):
+        names = [name] if name else list(LEGACY_FILES)
+        return all(self._path(n) is not None and os.path.exists(self._path(n)) for n in names)
+
+    def features(self, name):
+        if self.manifest and name in self.manifest['models']:
+            return self.manifest['models'][name]['features']
+        return None
+
+    def get(self, name):
+        """Returns the model, loading it on first access (None if it does not exist)."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._models:
+                if not self.available(name):
+                    return None
+                path = self._path(name)
+                if self.manifest:
+                    # Imported on first load: reading the manifest (e.g. a status check) stays cheap
+                    import joblib
+                    self._models[name] = joblib.load(path, mmap_mode=self.mmap_mode)
+                else:
+                    with open(path, 'rb') as f:
+                        self._models[name] = pickle.load(f)
+            return self._models[name]
+
+    def get_compiled(self, name):
+        """Returns the compiled NumPy engine of the model (None for versions published without one)."""
+        engine = self._compiled.get(name)
+        if engine is not None:
+            return engine
+
+        entry = self.manifest['models'].get(name) if self.manifest else None
+        if not entry or 'compiled' not in entry:
+            return None
+        with self._lock:
+            if name not in self._compiled:
+                self._compiled[name] = load_compiled(os.path.join(self.model_dir, entry['compiled']), self.mmap_mode)
+            return self._compiled[name]
+
+    def predictor(self, name):
+        """The model to score with: the compiled engine when there is one, else the sklearn model."""
+        return self.get_compiled(name) or self.get(name)
+
+    def loaded(self):
+        return sorted(self._models) + sorted(f"{name} (compiled)" for name in self._compiled)
@@ -1,33 +1,119 @@
 import pandas as pd
-import pickle
+import numpy as np
+import multiprocessing
+import argparse
+import hashlib
+import json
+import time
+import sys
 import os
 from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.metrics import accuracy_score, classification_report
 
 # Paths
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_PATH = os.path.join(BASE_DIR, '../analytics/cleaned_data.csv')
-MODEL_DIR = os.path.join(BASE_DIR, 'models')
+sys.path.append(os.path.join(BASE_DIR, '..'))
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(BASE_DIR, 'models'))
 
-def train_models():
-    if not os.path.exists(DATA_PATH):
+from analytics.feature_store import data_available, read_features, iter_features
+from analytics.features import MODEL_FEATURES, TARGET
+from ml_core.registry import save_models
+from ml_core.compiled import compile_model, check_parity
+from monitoring import metrics
+from monitoring.metrics import peak_memory_mb
+
+FIT_SECONDS = metrics.histogram('train_fit_seconds', 'Wall time of each model fit.', ['model', 'mode'])
+STAGE_SECONDS = metrics.histogram('train_stage_seconds', 'Time spent outside model fits, per stage.', ['stage'])
+
+MODEL_TITLES = {'lr': 'Logistic Regression', 'rf': 'Random Forest', 'kmeans': 'K-Means Clustering'}
+REPORT_PATH = os.path.join(MODEL_DIR, 'training_report.json')
+# Held-out rows each compiled model is checked against before it is published
+PARITY_ROWS = 10_000
+
+def training_data_hash(df):
+    # Content hash of the training frame, independent of row index
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+
+def fit_logistic_regression(X_train, y_train):
+    model = LogisticRegression()
+    model.fit(X_train, y_train)
+    return model
+
+def fit_random_forest(X_train, y_train, n_jobs=None):
+    # n_jobs=-1 builds trees on all cores
+    model = RandomForestClassifier(n_estimators=100, n_jobs=n_jobs)
+    model.fit(X_train, y_train)
+    return model
+
+def fit_kmeans(X_cluster):
+    # KMeans runs its Lloyd iterations on all cores through OpenMP
+    model = KMeans(n_clusters=3, random_state=42)
+    model.fit(X_cluster)
+    return model
+
+def timed_fit(job):
+    """Runs one (name, fit function, args) job and measures it. Also used as the pool worker."""
+    name, fit, args = job
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    model = fit(*args)
+    stats = {
+        'wall_s': round(time.perf_counter() - start_wall, 3),
+        'cpu_s': round(time.process_time() - start_cpu, 3),
+        'peak_rss_mb': peak_memory_mb()
+    }
+    return name, model, stats
+
+def compile_models(models, X_check):
+    """Export step: flattens every model into NumPy arrays for low-latency scoring.
+
+    Each compiled model must reproduce its sklearn model's outputs on
+    `X_check`, otherwise nothing is published.
+    """
+    compiled = {}
+    for name, model in models.items():
+        compiled[name] = compile_model(model, MODEL_FEATURES[name])
+        check_parity(model, compiled[name], X_check[MODEL_FEATURES[name]])
+    return compiled
+
+def write_report(report):
+    def fmt(value):
+        return 'n/a' if value is None else f"{value:.2f}"
+
+    print(f"\n{'model':<10}{'wall_s':>10}{'cpu_s':>10}{'peak_rss_mb':>14}")
+    for name, stats in report['models'].items():
+        print(f"{name:<10}{fmt(stats['wall_s']):>10}{fmt(stats['cpu_s']):>10}{fmt(stats['peak_rss_mb']):>14}")
+    print(f"Total: {report['total_wall_s']:.2f}s for {report['rows']:,} rows on {report['cores']} cores ({report['mode']})")
+
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Training report saved to {REPORT_PATH}")
+
+    for name, stats in report['models'].items():
+        FIT_SECONDS.observe(stats['wall_s'], model=name, mode=report['mode'])
+    metrics.write_run_summary('train', report)
+
+def train_models(parallel=False, n_jobs=None):
+    if not data_available():
         print("Data file not found. Run etl_process.py first.")
         return
 
-    print("Loading data...")
-    df = pd.read_csv(DATA_PATH)
-    
+    start = time.perf_counter()
     # Prepare Features and Target
     # Predicting 'is_high_value' as a proxy for 'Risk/Priority'
     # Features: tx_hour, tx_day_of_week, account_age_days
     # Note: In a real app we'd use more complex features and encoding.
     
-    features = ['tx_hour', 'tx_day_of_week', 'account_age_days']
-    target = 'is_high_value'
+    features = MODEL_FEATURES['lr']
+    target = TARGET
+
+    print("Loading data...")
+    # Only the columns the models use are read from the feature store
+    with STAGE_SECONDS.time(stage='load'):
+        df = read_features(columns=features + [target, 'amount'])
     
     X = df[features]
     y = df[target]
@@ -37,37 +123,188 @@ def train_models():
     if not os.path.exists(MODEL_DIR):
         os.makedirs(MODEL_DIR)
 
-    # 1. Logistic Regression
-    print("Training Logistic Regression...")
-    lr_model = LogisticRegression()
-    lr_model.fit(X_train, y_train)
-    y_pred_lr = lr_model.predict(X_test)
-    print("Logistic Regression Accuracy:", accuracy_score(y_test, y_pred_lr))
-    
-    with open(f'{MODEL_DIR}/logistic_regression.pkl', 'wb') as f:
-        pickle.dump(lr_model, f)
-
-    # 2. Random Forest
-    print("Training Random Forest...")
-    rf_model = RandomForestClassifier(n_estimators=100)
-    rf_model.fit(X_train, y_train)
-    y_pred_rf = rf_model.predict(X_test)
-    print("Random Forest Accuracy:", accuracy_score(y_test, y_pred_rf))
-    
-    with open(f'{MODEL_DIR}/random_forest.pkl', 'wb') as f:
-        pickle.dump(rf_model, f)
-        
-    # 3. K-Means Clustering
-    print("Training K-Means Clustering...")
-    # Clustering on Amount and Frequency (proxy) or just Amount/Hour
-    X_cluster = df[['amount', 'tx_hour']]
-    kmeans = KMeans(n_clusters=3, random_state=42)
-    kmeans.fit(X_cluster)
+    if parallel and n_jobs is None:
+        n_jobs = -1
+
+    jobs = [
+        # 1. Logistic Regression
+        ('lr', fit_logistic_regression, (X_train, y_train)),
+        # 2. Random Forest
+        ('rf', fit_random_forest, (X_train, y_train, n_jobs)),
+        # 3. K-Means Clustering
+        # Clustering on Amount and Frequency (proxy) or just Amount/Hour
+        ('kmeans', fit_kmeans, (df[MODEL_FEATURES['kmeans']],)),
+    ]
+
+    if parallel:
+        print(f"Training {len(jobs)} models in parallel on {os.cpu_count()} cores...")
+        # One fresh process per model, so peak memory is measured per model
+        with multiprocessing.Pool(processes=len(jobs), maxtasksperchild=1) as pool:
+            results = pool.map(timed_fit, jobs)
+    else:
+        results = []
+        for job in jobs:
+            print(f"Training {MODEL_TITLES[job[0]]}...")
+            results.append(timed_fit(job))
+
+    models = {name: model for name, model, _ in results}
+    with STAGE_SECONDS.time(stage='evaluate'):
+        lr_accuracy = accuracy_score(y_test, models['lr'].predict(X_test))
+        print("Logistic Regression Accuracy:", lr_accuracy)
+        rf_accuracy = accuracy_score(y_test, models['rf'].predict(X_test))
+        print("Random Forest Accuracy:", rf_accuracy)
+
+    with STAGE_SECONDS.time(stage='compile'):
+        compiled = compile_models(models, df.loc[X_test.index[:PARITY_ROWS]])
     
-    with open(f'{MODEL_DIR}/kmeans.pkl', 'wb') as f:
-        pickle.dump(kmeans, f)
+    with STAGE_SECONDS.time(stage='save'):
+        manifest = save_models(
+            models,
+            MODEL_FEATURES,
+            training_data_hash(df),
+            {
+                'lr': {'accuracy': float(lr_accuracy)},
+                'rf': {'accuracy': float(rf_accuracy)},
+                'kmeans': {'inertia': float(models['kmeans'].inertia_)},
+            },
+            model_dir=MODEL_DIR,
+            compiled=compiled
+        )
         
-    print(f"Models saved to {os.path.abspath(MODEL_DIR)}")
+    print(f"Models saved to {os.path.abspath(MODEL_DIR)} (version {manifest['version']})")
+
+    write_report({
+        'mode': 'parallel' if parallel else 'sequential',
+        'rows': len(df),
+        'cores': os.cpu_count(),
+        'n_jobs': n_jobs,
+        'version': manifest['version'],
+        'total_wall_s': round(time.perf_counter() - start, 3),
+        'models': {name: stats for name, _, stats in results}
+    })
+
+def train_models_incremental(batch_size=500_000, sample_rows=1_000_000, n_jobs=-1):
+    """Trains on the feature store batch by batch so the full table never has to fit in memory.
+
+    Logistic regression becomes an SGD log-loss classifier and K-Means a
+    MiniBatchKMeans, both fitted with partial_fit. The random forest, which
+    has no incremental variant, is fitted on a uniform sample of at most
+    `sample_rows` training rows. Rows with transaction_id % 5 == 0 are held
+    out for evaluation (a sample of them is kept in memory).
+    """
+    if not data_available():
+        print("Data file not found. Run etl_process.py first.")
+        return
+
+    start = time.perf_counter()
+    features = MODEL_FEATURES['lr']
+    columns = ['transaction_id'] + features + [TARGET, 'amount']
+    timings = {name: 0.0 for name in MODEL_TITLES}
+
+    # Pass 1: row count, feature scaling statistics and a content hash
+    print("Scanning feature store...")
+    digest = hashlib.sha256()
+    rows, n_train = 0, 0
+    sums, squares = np.zeros(len(features)), np.zeros(len(features))
+    for batch in STAGE_SECONDS.time_iter(iter_features(columns=columns, batch_size=batch_size), stage='load'):
+        digest.update(pd.util.hash_pandas_object(batch[columns[1:]], index=False).values.tobytes())
+        X = batch.loc[batch['transaction_id'] % 5 != 0, features].to_numpy(dtype=float)
+        rows += len(batch)
+        n_train += len(X)
+        sums += X.sum(axis=0)
+        squares += (X ** 2).sum(axis=0)
+    n_train = max(n_train, 1)
+    mean = sums / n_train
+    std = np.sqrt(np.maximum(squares / n_train - mean ** 2, 0))
+    std[std == 0] = 1.0
+    keep = min(1.0, sample_rows / n_train)
+
+    # Pass 2: partial_fit on each batch, sampling rows for the forest and for evaluation
+    print(f"Training on {rows:,} rows in batches of {batch_size:,}...")
+    rng = np.random.default_rng(42)
+    lr_model = SGDClassifier(loss='log_loss', random_state=42)
+    kmeans = MiniBatchKMeans(n_clusters=3, random_state=42, n_init=3)
+    train_samples, test_samples = [], []
+    for batch in STAGE_SECONDS.time_iter(iter_features(columns=columns, batch_size=batch_size), stage='load'):
+        is_test = (batch['transaction_id'] % 5 == 0).to_numpy()
+        train, test = batch[~is_test], batch[is_test]
+
+        if len(train):
+            t = time.perf_counter()
+            lr_model.partial_fit((train[features] - mean) / std, train[TARGET], classes=[0, 1])
+            timings['lr'] += time.perf_counter() - t
+
+        t = time.perf_counter()
+        kmeans.partial_fit(batch[MODEL_FEATURES['kmeans']])
+        timings['kmeans'] += time.perf_counter() - t
+
+        train_samples.append(train[rng.random(len(train)) < keep])
+        test_samples.append(test[rng.random(len(test)) < keep])
+
+    # Fold the standardization into the coefficients so the model scores raw features
+    lr_model.coef_ = lr_model.coef_ / std
+    lr_model.intercept_ = lr_model.intercept_ - (lr_model.coef_ * mean).sum(axis=1)
+
+    sample = pd.concat(train_samples, ignore_index=True)
+    holdout = pd.concat(test_samples, ignore_index=True)
+    print(f"Training Random Forest on a {len(sample):,} row sample...")
+    _, rf_model, rf_stats = timed_fit(('rf', fit_random_forest, (sample[features], sample[TARGET], n_jobs)))
+    timings['rf'] = rf_stats['wall_s']
+
+    with STAGE_SECONDS.time(stage='evaluate'):
+        lr_accuracy = accuracy_score(holdout[TARGET], lr_model.predict(holdout[features]))
+        print("Logistic Regression (SGD) Accuracy:", lr_accuracy)
+        rf_accuracy = accuracy_score(holdout[TARGET], rf_model.predict(holdout[features]))
+        print("Random Forest Accuracy:", rf_accuracy)
+
+    models = {'lr': lr_model, 'rf': rf_model, 'kmeans': kmeans}
+    with STAGE_SECONDS.time(stage='compile'):
+        compiled = compile_models(models, holdout.head(PARITY_ROWS))
+
+    with STAGE_SECONDS.time(stage='save'):
+        manifest = save_models(
+            models,
+            MODEL_FEATURES,
+            digest.hexdigest(),
+            {
+                'lr': {'accuracy': float(lr_accuracy)},
+                'rf': {'accuracy': float(rf_accuracy), 'sample_rows': len(sample)},
+                'kmeans': {'inertia': float(kmeans.inertia_)},
+            },
+            model_dir=MODEL_DIR,
+            compiled=compiled
+        )
+    print(f"Models saved to {os.path.abspath(MODEL_DIR)} (version {manifest['version']})")
+
+    # Fit time per model; CPU time is only separable for the forest, and peak memory is process-wide here
+    peak = peak_memory_mb()
+    write_report({
+        'mode': 'incremental',
+        'rows': rows,
+        'cores': os.cpu_count(),
+        'n_jobs': n_jobs,
+        'version': manifest['version'],
+        'total_wall_s': round(time.perf_counter() - start, 3),
+        'models': {
+            name: {'wall_s': round(wall, 3), 'cpu_s': rf_stats['cpu_s'] if name == 'rf' else None, 'peak_rss_mb': peak}
+            for name, wall in timings.items()
+        }
+    })
 
 if __name__ == "__main__":
-    train_models()
+    parser = argparse.ArgumentParser(description="Train the risk and segmentation models.")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Train the models concurrently in a process pool, using all cores.")
+    parser.add_argument("--n-jobs", type=int, default=None,
+                        help="Cores for random forest tree building (default: 1, or all with --parallel).")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Stream the feature store and use partial_fit learners (for tables larger than memory).")
+    parser.add_argument("--batch-size", type=int, default=500_000)
+    parser.add_argument("--sample-rows", type=int, default=1_000_000,
+                        help="Rows sampled for the random forest in --incremental mode.")
+    args = parser.parse_args()
+
+    if args.incremental:
+        train_models_incremental(args.batch_size, args.sample_rows, n_jobs=args.n_jobs or -1)
+    else:
+        train_models(parallel=args.parallel, n_jobs=args.n_jobs)
@@ -0,0 +1,191 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# JSON summaries written by batch jobs (ETL, training, batch scoring)
+SUMMARY_DIR = os.getenv("RUN_SUMMARY_DIR", os.path.join(BASE_DIR, 'runs'))
+
+# Seconds; covers sub-millisecond model calls up to multi-minute batch stages
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class Metric:
+    """Base class: one value per combination of label values, guarded by a lock."""
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_pairs(self, key):
+        return list(zip(self.labelnames, key))
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._label_pairs(key), value) for key, value in self._values.items()]
+
+    def summary(self):
+        with self._lock:
+            return {_format_labels(self._label_pairs(key)): value for key, value in self._values.items()}
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (last one is +Inf), sum, count, max]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, value]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+            state[3] = max(state[3], value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def time_iter(self, iterable, **labels):
+        """Yields from `iterable`, observing the time spent producing each item (e.g. reading a chunk)."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(time.perf_counter() - start, **labels)
+            yield item
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, count, _) in self._values.items():
+                pairs = self._label_pairs(key)
+                cumulative = 0
+                for bound, n in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += n
+                    out.append((f"{self.name}_bucket", pairs + [('le', bound)], cumulative))
+                out.append((f"{self.name}_sum", pairs, total))
+                out.append((f"{self.name}_count", pairs, count))
+        return out
+
+    def summary(self):
+        with self._lock:
+            return {
+                _format_labels(self._label_pairs(key)): {
+                    'count': count, 'sum': round(total, 6), 'mean': round(total / count, 6), 'max': round(peak, 6)
+                }
+                for key, (_, total, count, peak) in self._values.items()
+            }
+
+# Process-wide registry; get-or-create so re-imports (e.g. Streamlit reruns) reuse the same metric
+_metrics = {}
+_registry_lock = threading.Lock()
+
+def _get_or_create(cls, name, help, labelnames, **kwargs):
+    with _registry_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, help, labelnames, **kwargs)
+        return metric
+
+def counter(name, help, labelnames=()):
+    return _get_or_create(Counter, name, help, labelnames)
+
+def gauge(name, help, labelnames=()):
+    return _get_or_create(Gauge, name, help, labelnames)
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in list(_metrics.values()):
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, pairs, value in metric.samples():
+            lines.append(f"{name}{_format_labels(pairs)} {value}")
+    return '\n'.join(lines) + '\n'
+
+def summary():
+    return {name: metric.summary() for name, metric in _metrics.items() if metric.summary()}
+
+def write_run_summary(job, extra=None):
+    """Writes <SUMMARY_DIR>/<job>.json with every metric recorded by this process plus `extra`."""
+    os.makedirs(SUMMARY_DIR, exist_ok=True)
+    path = os.path.join(SUMMARY_DIR, f"{job}.json")
+    doc = {
+        'job': job,
+        'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'peak_rss_mb': peak_memory_mb(),
+        **(extra or {}),
+        'metrics': summary()
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(doc, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,37 @@
+import os
+import sqlite3
+import sys
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+
+from analytics import etl_process, feature_store, rollups
+from database.seed_data import init_db, generate_data_bulk
+from monitoring import metrics
+
+# Small enough for a quick run, large enough for a few hundred PENDING rows
+SEED_CUSTOMERS = 50
+SEED_TRANSACTIONS = 5_000
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """Seeds a scratch legacy database and points the ETL (store, state, rollups, run summaries) at tmp_path."""
+    db_path = str(tmp_path / 'legacy_system.db')
+    conn = sqlite3.connect(db_path)
+    try:
+        init_db(conn)
+        generate_data_bulk(conn, num_customers=SEED_CUSTOMERS, num_transactions=SEED_TRANSACTIONS, seed=7)
+    finally:
+        conn.close()
+
+    store_path = str(tmp_path / 'feature_store')
+    rollup_path = str(tmp_path / 'rollups')
+    monkeypatch.setattr(etl_process, 'DB_PATH', db_path)
+    monkeypatch.setattr(etl_process, 'STATE_PATH', str(tmp_path / 'etl_state.json'))
+    monkeypatch.setattr(etl_process, 'STORE_PATH', store_path)
+    monkeypatch.setattr(feature_store, 'STORE_PATH', store_path)
+    monkeypatch.setattr(etl_process, 'ROLLUP_PATH', rollup_path)
+    monkeypatch.setattr(rollups, 'ROLLUP_PATH', rollup_path)
+    monkeypatch.setattr(metrics, 'SUMMARY_DIR', str(tmp_path / 'runs'))
+    return db_path
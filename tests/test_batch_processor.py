@@ -0,0 +1,64 @@
+import sqlite3
+import threading
+
+from analytics import etl_process
+from analytics.feature_store import read_features
+from legacy_app.batch_processor import PENDING_COUNT_QUERY, connect, process_transactions
+
+def db_statuses(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT transaction_id, status FROM transactions"))
+    finally:
+        conn.close()
+
+def test_processed_at_has_sub_second_precision(legacy_db):
+    conn = connect(legacy_db)
+    try:
+        pending = [row[0] for row in conn.execute("SELECT transaction_id FROM transactions WHERE status = 'PENDING'")]
+        process_transactions(conn, chunk_size=100)
+        stamps = [conn.execute("SELECT processed_at FROM transactions WHERE transaction_id = ?", (tx_id,)).fetchone()[0]
+                  for tx_id in pending]
+    finally:
+        conn.close()
+    assert stamps
+    assert all(len(stamp) == len('2025-01-01 00:00:00.000') for stamp in stamps)
+
+def test_batch_alongside_etl_loses_no_rows(legacy_db):
+    etl_process.run_pipeline(full_refresh=True)
+    # Switch to WAL before the ETL starts reading, as the first batch run does
+    conn = connect(legacy_db)
+    pending = conn.execute(PENDING_COUNT_QUERY).fetchone()[0]
+    conn.close()
+    assert pending > 0
+
+    errors, processed = [], []
+
+    def batch():
+        conn = connect(legacy_db)
+        try:
+            # Small chunks with pauses, so incremental ETL runs land between (and during) commits
+            processed.append(process_transactions(conn, chunk_size=20, pause=0.2))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    writer = threading.Thread(target=batch)
+    writer.start()
+    etl_runs = 0
+    try:
+        while writer.is_alive():
+            etl_process.run_pipeline()
+            etl_runs += 1
+    finally:
+        writer.join()
+    # Picks up the chunks committed after the last concurrent run
+    etl_process.run_pipeline()
+
+    assert not errors
+    assert processed == [pending]
+    assert etl_runs > 1
+
+    store = read_features(columns=['transaction_id', 'status'])
+    assert dict(zip(store['transaction_id'], store['status'].astype(str))) == db_statuses(legacy_db)
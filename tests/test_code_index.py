@@ -0,0 +1,55 @@
+import os
+import sqlite3
+
+import code_index
+from code_index import INDEX_VERSION, load_index, update_index
+
+def write(path, source):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(source)
+
+def test_loading_a_stale_index_leaves_it_untouched(tmp_path):
+    root, db_path = str(tmp_path / 'src'), str(tmp_path / 'code_index.db')
+    write(os.path.join(root, 'a.py'), "def f(x):\n    return x\n")
+    update_index(root, db_path, workers=1)
+    assert [record['path'] for record in load_index(root, db_path)] == ['a.py']
+
+    # An index from another version of the metrics
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA user_version = {INDEX_VERSION + 1}")
+    conn.close()
+    assert load_index(root, db_path) == []
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == INDEX_VERSION + 1
+        assert conn.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+def test_file_removed_before_parsing_is_recorded_and_retried(tmp_path, monkeypatch):
+    root, db_path = str(tmp_path / 'src'), str(tmp_path / 'code_index.db')
+    for name in ('a.py', 'b.py'):
+        write(os.path.join(root, name), f"# {name}\nimport os\n")
+    iter_python_files = code_index.iter_python_files
+
+    def remove_after_hashing(path):
+        yield from iter_python_files(path)
+        # Every file has been hashed; b.py goes away before the parse
+        os.rename(os.path.join(root, 'b.py'), os.path.join(root, 'b.tmp'))
+
+    monkeypatch.setattr(code_index, 'iter_python_files', remove_after_hashing)
+    stats = update_index(root, db_path, workers=1)
+    assert stats['parsed'] == 2
+    records = {record['path']: record for record in load_index(root, db_path)}
+    assert records['a.py']['parse_error'] is None
+    assert records['b.py']['parse_error'].startswith(code_index.READ_ERROR)
+
+    # Back in place: parsed again although its content hash is known
+    monkeypatch.setattr(code_index, 'iter_python_files', iter_python_files)
+    os.rename(os.path.join(root, 'b.tmp'), os.path.join(root, 'b.py'))
+    update_index(root, db_path, workers=1)
+    records = {record['path']: record for record in load_index(root, db_path)}
+    assert records['b.py']['parse_error'] is None
+    assert records['b.py']['imports'] == ['os']
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.features import MODEL_FEATURES
+from ml_core.compiled import PARITY_TOLERANCE, compile_model, load_compiled
+from ml_core.train_models import fit_kmeans, fit_logistic_regression, fit_random_forest
+
+TRAIN_ROWS = 2_000
+
+def feature_frame(rng, rows):
+    """Rows in the ranges the ETL produces."""
+    return pd.DataFrame({
+        'tx_hour': rng.integers(0, 24, rows),
+        'tx_day_of_week': rng.integers(0, 7, rows),
+        'account_age_days': rng.integers(0, 5 * 365, rows),
+        'amount': np.round(rng.uniform(10.0, 5000.0, rows), 2),
+    })
+
+def out_of_range_frame():
+    """Values never seen in training: negative, far too large, and fractional."""
+    values = {
+        'tx_hour': [-1, 24, 1e6, 11.5],
+        'tx_day_of_week': [-3, 7, 1e6, 2.5],
+        'account_age_days': [-1e5, 1e9, 0, 364.5],
+        'amount': [-1e6, 1e12, 0.0, 499.999],
+    }
+    # Every combination of the per-feature extremes
+    grid = pd.MultiIndex.from_product(values.values(), names=list(values)).to_frame(index=False)
+    return grid.astype(np.float64)
+
+@pytest.fixture(scope='module')
+def fitted():
+    rng = np.random.default_rng(0)
+    df = feature_frame(rng, TRAIN_ROWS)
+    # Noisy, learnable target so the trees grow real splits
+    y = ((df['account_age_days'] / 365 + df['tx_hour'] / 6 + rng.normal(0, 1, TRAIN_ROWS)) > 4).astype(int)
+    models = {
+        'lr': fit_logistic_regression(df[MODEL_FEATURES['lr']], y),
+        'rf': fit_random_forest(df[MODEL_FEATURES['rf']], y),
+        'kmeans': fit_kmeans(df[MODEL_FEATURES['kmeans']]),
+    }
+    return models, feature_frame(np.random.default_rng(1), 1_000)
+
+def threshold_frame(model, features):
+    """Rows on and right next to the forest's split thresholds, where float32 rounding decides the branch."""
+    rng = np.random.default_rng(2)
+    rows = []
+    for estimator in model.estimators_[:10]:
+        tree = estimator.tree_
+        for node in np.flatnonzero(tree.children_left != -1)[:20]:
+            threshold = tree.threshold[node]
+            for value in (np.nextafter(threshold, -np.inf), threshold, np.nextafter(threshold, np.inf)):
+                row = feature_frame(rng, 1)[features].iloc[0].astype(np.float64)
+                row.iloc[tree.feature[node]] = value
+                rows.append(row)
+    return pd.DataFrame(rows, columns=features)
+
+def assert_parity(model, compiled, X):
+    if hasattr(model, 'predict_proba'):
+        np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=0, atol=PARITY_TOLERANCE)
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+
+@pytest.mark.parametrize('name', ['lr', 'rf', 'kmeans'])
+def test_compiled_matches_sklearn(fitted, name):
+    models, test = fitted
+    model, features = models[name], MODEL_FEATURES[name]
+    compiled = compile_model(model, features)
+
+    assert_parity(model, compiled, test[features])
+    assert_parity(model, compiled, test[features].head(1))
+    with np.errstate(over='ignore'):
+        assert_parity(model, compiled, out_of_range_frame()[features])
+    if name == 'rf':
+        assert_parity(model, compiled, threshold_frame(model, features))
+
+@pytest.mark.parametrize('name', ['lr', 'rf', 'kmeans'])
+def test_saved_compiled_model_matches_sklearn(fitted, tmp_path, name):
+    models, test = fitted
+    model, features = models[name], MODEL_FEATURES[name]
+    compile_model(model, features).save(str(tmp_path / name))
+
+    # Memory-mapped, as the registry loads it
+    assert_parity(model, load_compiled(str(tmp_path / name)), test[features])
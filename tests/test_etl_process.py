@@ -0,0 +1,90 @@
+import sqlite3
+import pandas as pd
+
+from analytics import etl_process
+from analytics.feature_store import read_features
+from analytics.rollups import ROLLUP_KEYS, build_rollups, load_rollups, rollups_version
+from database.seed_data import generate_data_bulk
+
+def store_status(ids):
+    store = read_features(columns=['transaction_id', 'status'])
+    return store.loc[store['transaction_id'].isin(ids), 'status'].astype(str).tolist()
+
+def test_incremental_run_picks_up_rows_processed_in_the_watermark_second(legacy_db):
+    etl_process.run_pipeline(full_refresh=True)
+    watermark = etl_process.load_watermark()
+
+    # The batch job marks rows PROCESSED after the ETL snapshot, stamped with the same timestamp
+    conn = sqlite3.connect(legacy_db)
+    with conn:
+        ids = [row[0] for row in conn.execute(
+            "SELECT transaction_id FROM transactions WHERE status = 'PENDING' ORDER BY transaction_id LIMIT 50")]
+        conn.executemany("UPDATE transactions SET status = 'PROCESSED', processed_at = ? WHERE transaction_id = ?",
+                         [(watermark['last_processed_at'], tx_id) for tx_id in ids])
+    conn.close()
+    assert len(ids) == 50
+    assert store_status(ids) == ['PENDING'] * 50
+
+    etl_process.run_pipeline()
+    assert store_status(ids) == ['PROCESSED'] * 50
+
+def read_store():
+    store = read_features()
+    return store.astype({column: str for column in ('transaction_type', 'status', 'segment')})
+
+def test_full_rebuild_reads_back_in_the_same_order_in_every_mode(legacy_db):
+    etl_process.run_pipeline(full_refresh=True)
+    serial = read_store()
+
+    etl_process.run_pipeline(full_refresh=True, chunk_size=1_000)
+    streamed = read_store()
+    etl_process.run_pipeline(full_refresh=True, chunk_size=1_000, workers=2)
+    sharded = read_store()
+
+    assert streamed.equals(serial)
+    assert sharded.equals(serial)
+
+def assert_rollups_equal(actual, expected):
+    for name in ROLLUP_KEYS:
+        pd.testing.assert_frame_equal(actual[name], expected[name], check_dtype=False, rtol=1e-9)
+
+def test_incremental_runs_merge_new_rows_into_the_rollups(legacy_db):
+    etl_process.run_pipeline(full_refresh=True)
+    built_at = rollups_version()
+
+    # Status-only changes: nothing to aggregate, the rollups are left as they are
+    conn = sqlite3.connect(legacy_db)
+    with conn:
+        conn.execute("UPDATE transactions SET status = 'PROCESSED', processed_at = '2100-01-01 00:00:00.000' "
+                     "WHERE status = 'PENDING'")
+    etl_process.run_pipeline()
+    assert rollups_version() == built_at
+
+    # New transactions are merged into the stored rollups
+    generate_data_bulk(conn, num_customers=5, num_transactions=300, seed=8)
+    conn.close()
+    etl_process.run_pipeline()
+    assert rollups_version() != built_at
+    assert_rollups_equal(load_rollups(), build_rollups())
+
+def test_watermark_without_processed_at_only_extracts_new_rows(legacy_db):
+    etl_process.run_pipeline(full_refresh=True)
+    watermark = etl_process.load_watermark()
+
+    # A state file written before any row was processed
+    df, _ = etl_process.extract_delta(dict(watermark, last_processed_at=None))
+    assert df.empty
+
+def test_first_run_with_nothing_processed_still_sees_later_processing(legacy_db):
+    conn = sqlite3.connect(legacy_db)
+    with conn:
+        conn.execute("UPDATE transactions SET status = 'PENDING', processed_at = NULL")
+    etl_process.run_pipeline(full_refresh=True)
+    assert etl_process.load_watermark()['last_processed_at'] is not None
+
+    with conn:
+        conn.execute("UPDATE transactions SET status = 'PROCESSED', "
+                     "processed_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE transaction_id <= 10")
+    conn.close()
+    df, _ = etl_process.extract_delta(etl_process.load_watermark())
+    assert sorted(df['transaction_id']) == list(range(1, 11))
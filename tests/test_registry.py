@@ -0,0 +1,62 @@
+import os
+import time
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from ml_core import registry
+from ml_core.registry import ModelRegistry, save_models
+
+def fit(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(200, 3))
+    return LogisticRegression().fit(X, (X[:, 0] + rng.normal(size=200) > 0).astype(int))
+
+def test_publishes_within_one_second_get_separate_versions(tmp_path, monkeypatch):
+    model_dir = str(tmp_path)
+    features = {'lr': ['tx_hour', 'tx_day_of_week', 'account_age_days']}
+    # Both publishes see the same clock second and the same training data
+    now, strftime = time.localtime(), time.strftime
+    monkeypatch.setattr(registry.time, 'strftime', lambda fmt, t=None: strftime(fmt, now))
+
+    first = save_models({'lr': fit(0)}, features, 'a' * 64, {}, model_dir=model_dir)
+    first_path = os.path.join(model_dir, first['models']['lr']['file'])
+    first_coef = ModelRegistry(model_dir).get('lr').coef_.copy()
+    first_mtime = os.stat(first_path).st_mtime_ns
+
+    second = save_models({'lr': fit(1)}, features, 'a' * 64, {}, model_dir=model_dir)
+    assert second['version'] == f"{first['version']}-1"
+    assert os.stat(first_path).st_mtime_ns == first_mtime
+    assert ModelRegistry(model_dir).version == second['version']
+
+    # The first version's files are untouched for anyone still serving it
+    np.testing.assert_array_equal(joblib.load(first_path).coef_, first_coef)
+
+def test_pruning_keeps_the_newest_versions_when_names_collide(tmp_path, monkeypatch):
+    model_dir = str(tmp_path)
+    features = {'lr': ['tx_hour', 'tx_day_of_week', 'account_age_days']}
+    now, strftime = time.localtime(), time.strftime
+    monkeypatch.setattr(registry.time, 'strftime', lambda fmt, t=None: strftime(fmt, now))
+
+    # Same second: collision suffixes past -9, then data hashes that sort before the earlier ones
+    published = [save_models({'lr': fit(i)}, features, 'f' * 64, {}, model_dir=model_dir)['version']
+                 for i in range(12)]
+    published += [save_models({'lr': fit(i)}, features, f"{9 - i}" * 64, {}, model_dir=model_dir)['version']
+                  for i in range(2)]
+
+    remaining = sorted(os.listdir(os.path.join(model_dir, registry.VERSIONS_DIR)))
+    assert remaining == sorted(published[-registry.KEEP_VERSIONS:])
+    assert ModelRegistry(model_dir).version == published[-1]
+    assert ModelRegistry(model_dir).get('lr') is not None
+
+def test_pruning_never_removes_the_manifest_version(tmp_path):
+    model_dir = str(tmp_path)
+    features = {'lr': ['tx_hour', 'tx_day_of_week', 'account_age_days']}
+    current = save_models({'lr': fit(0)}, features, 'a' * 64, {}, model_dir=model_dir)['version']
+    versions_root = os.path.join(model_dir, registry.VERSIONS_DIR)
+    # Newer-looking directories that the manifest does not point to
+    for n in range(registry.KEEP_VERSIONS + 1):
+        os.mkdir(os.path.join(versions_root, f"29991231-2359{n:02d}-bbbbbbbb"))
+
+    registry.prune_versions(model_dir)
+    assert current in os.listdir(versions_root)
@@ -0,0 +1,75 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.rollups import (
+    AMOUNT_BIN_WIDTH, MAX_CHART_BINS, ROLLUP_COLUMNS, add_statistics, binned_kde, coarsen_amount_bins, compute_rollups,
+    summarize_csv, totals
+)
+
+HEADER = ','.join(ROLLUP_COLUMNS)
+
+def csv(*rows):
+    return io.StringIO('\n'.join((HEADER,) + rows) + '\n')
+
+def test_upload_with_blank_cells_is_summarized():
+    # segment, tx_hour, tx_day_of_week, transaction_date, amount, is_high_value
+    rollups, sample, rows = summarize_csv(csv(
+        'Retail,10,1,2024-01-01 10:00:00,100.0,0',
+        'Retail,,2,2024-01-02 11:00:00,200.0,',
+        'Premium,12,,2024-01-03 12:00:00,,1',
+    ), chunk_size=2)
+
+    assert rows == 3 and len(sample) == 3
+    assert totals(rollups) == {'count': 2, 'amount_sum': 300.0, 'amount_mean': 150.0, 'high_value_count': 1}
+    # Rows with a blank key are left out of that rollup only
+    assert rollups['hour']['tx_hour'].tolist() == [10, 12]
+    assert rollups['day_of_week']['tx_day_of_week'].tolist() == [1, 2]
+
+@pytest.mark.parametrize('row, message', [
+    ('Retail,ten,1,2024-01-01 10:00:00,100.0,0', "column 'tx_hour' has an invalid value 'ten' on line 3"),
+    ('Retail,400,1,2024-01-01 10:00:00,100.0,0', "column 'tx_hour' has an invalid value '400' on line 3"),
+    ('Retail,10,1,2024-01-01 10:00:00,lots,0', "column 'amount' has an invalid value 'lots' on line 3"),
+])
+def test_upload_with_an_invalid_value_names_it(row, message):
+    with pytest.raises(ValueError, match=message):
+        summarize_csv(csv('Retail,10,1,2024-01-01 10:00:00,100.0,0', row), chunk_size=1)
+
+def test_upload_without_a_rollup_column_names_it():
+    source = io.StringIO('segment,amount\nRetail,100.0\n')
+    with pytest.raises(ValueError, match='missing column.*tx_hour'):
+        summarize_csv(source)
+
+def amount_rollup(amounts):
+    rows = len(amounts)
+    df = pd.DataFrame({'segment': 'Retail', 'tx_hour': 0, 'tx_day_of_week': 0, 'transaction_date': '2024-01-01',
+                       'amount': amounts, 'is_high_value': np.zeros(rows, dtype=np.int8)})
+    return compute_rollups(df)['amount_bin']
+
+def test_kde_matches_the_exact_sum_over_bins():
+    amount_bins = amount_rollup(np.random.default_rng(0).exponential(200, 50_000).round(2))
+    grid, kde = binned_kde(amount_bins)
+
+    # Every bin as a point mass at its centre, with the same bandwidth
+    centres = amount_bins['amount_bin'].to_numpy() + AMOUNT_BIN_WIDTH / 2
+    counts = amount_bins['count'].to_numpy()
+    stats = add_statistics(amount_bins.sum().to_frame().T)
+    n, std = stats['count'].iloc[0], stats['amount_std'].iloc[0]
+    bandwidth = max(1.06 * std * n ** (-1 / 5), AMOUNT_BIN_WIDTH / 2)
+    exact = np.exp(-0.5 * ((grid[:, None] - centres[None, :]) / bandwidth) ** 2) @ counts
+    exact *= AMOUNT_BIN_WIDTH / (bandwidth * np.sqrt(2 * np.pi))
+    np.testing.assert_allclose(kde, exact, rtol=0, atol=0.02 * exact.max())
+
+def test_wide_amount_range_stays_bounded():
+    # 100,000 distinct bins: a bins x bins kernel matrix would need 80 GB
+    amount_bins = amount_rollup(np.arange(100_000) * AMOUNT_BIN_WIDTH + 1.0)
+    grid, kde = binned_kde(amount_bins)
+    assert len(grid) == len(kde) <= 512
+    assert np.isfinite(kde).all()
+
+    bins, width = coarsen_amount_bins(amount_bins)
+    assert len(bins) <= MAX_CHART_BINS
+    assert width % AMOUNT_BIN_WIDTH == 0
+    assert bins['count'].sum() == amount_bins['count'].sum()
+    assert bins['amount_sum'].sum() == pytest.approx(amount_bins['amount_sum'].sum())